@@ -4,8 +4,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 import random
 import base64
+import time
 from datetime import datetime
 
+import rangers_stats as rs
+
 # ==========================================
 # 1. CONFIGURATION & THEME
 # ==========================================
@@ -55,35 +58,80 @@ st.markdown(f"""
 # 2. DATA LOGIC
 # ==========================================
 DATA_FILE = "rangers_data.csv"
+WARM_TOP = 20  # most-viewed players precomputed after startup and each data change
+
+@st.cache_resource
+def load_store():
+    """Process-wide match data and stats cache shared by every session."""
+    return rs.MatchStore(DATA_FILE, warm_top=WARM_TOP)
 
-@st.cache_data
-def load_data():
+def upsert_fixtures(updates):
+    """Insert or update many fixtures (keyed by Match Key) in one write.
+
+    Returns the {'updated', 'inserted'} counts, or None when nothing was saved;
+    problem rows are listed under the error.
+    """
     try:
-        df = pd.read_csv(DATA_FILE)
-        df['DateStr'] = df['Day'].astype(str) + "-" + df['Month'].astype(str) + "-" + df['Year'].astype(str)
-        df['Date'] = pd.to_datetime(df['DateStr'], errors='coerce')
-        df['ResultCode'] = df['Win/Lose/Draw'].astype(str).str[0].str.upper()
-        if 'Score (Rangers First)' in df.columns:
-            df['Score (Rangers First)'] = df['Score (Rangers First)'].astype(str)
-        cols_to_clean = [f'R{i}' for i in range(1, 23)]
-        for col in cols_to_clean:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.strip().replace('nan', None).replace('None', None)
-        return df.sort_values('Date', ascending=False)
-    except:
-        return pd.DataFrame()
-
-def save_data(df_to_save):
+        return load_store().upsert(updates)[1]
+    except ValueError as e:
+        st.error(f"Save Error: {e.args[0]}")
+        if len(e.args) > 1:
+            st.dataframe([r._asdict() for r in e.args[1]], hide_index=True, use_container_width=True)
+        return None
+    except Exception as e:
+        st.error(f"Save Error: {e}")
+        return None
+
+def register_player(name):
+    """Add a player to the persisted identity table; False if the name is already known."""
     try:
-        cols_drop = ['DateStr', 'Date', 'ResultCode']
-        df_c = df_to_save.drop(columns=[c for c in cols_drop if c in df_to_save.columns])
-        df_c.to_csv(DATA_FILE, index=False)
-        load_data.clear()
+        return load_store().register(name)
+    except Exception as e:
+        st.error(f"Save Error: {e}")
+        return False
+
+def merge_players(keep, duplicate):
+    try:
+        load_store().merge(keep, duplicate)
         return True
     except Exception as e:
         st.error(f"Save Error: {e}")
         return False
 
+def append_match(row):
+    """Append one match to the CSV and patch the shared data in place."""
+    try:
+        load_store().append(row)
+        return True
+    except Exception as e:
+        st.error(f"Save Error: {e}")
+        return False
+
+def cached_figure(key, build):
+    """Plotly figure memoized on the current Dataset.
+
+    `key` names the chart and its inputs (player, season, competition); the
+    Dataset is per data version and keeps figures in their own LRU, apart
+    from the shared tables, so figures are rebuilt only when the data or the
+    selection changes.
+    """
+    return ds.figure(key, build)
+
+def show_figure(key, build):
+    """Render the cached figure for `key`, timed as the 'chart' stage."""
+    with rs.METRICS.stage('chart', chart=key[0]):
+        st.plotly_chart(cached_figure(key, build), use_container_width=True)
+
+def player_picker(label, key):
+    """Search box plus a short selectbox of matches for st.session_state[key].
+
+    Only the current pick and the best few search hits (the most-capped
+    players before anything is typed) are sent to the browser.
+    """
+    query = st.text_input(label, key=f"{key}_q", placeholder="🔎 Search player...", label_visibility="collapsed")
+    options = list(dict.fromkeys([st.session_state[key]] + rs.search_players(ds, query)))
+    return st.selectbox(label, options, key=key, label_visibility="collapsed")
+
 def check_password():
     if "admin_password" not in st.secrets:
         st.error("🚨 Secrets config missing.")
@@ -115,24 +163,25 @@ with st.sidebar.container():
 
 st.sidebar.markdown("---")
 
-nav_options = ["Dashboard", "Head-to-Head", "Admin Panel"]
-icons = ["📊", "⚔️", "🔒"]
+nav_options = ["Dashboard", "Head-to-Head", "Lineups", "Admin Panel"]
+icons = ["📊", "⚔️", "🧩", "🔒"]
 nav_labels = [f"{icon}  {opt}" for icon, opt in zip(icons, nav_options)]
 selected_nav = st.sidebar.radio("Main Menu", nav_labels, label_visibility="collapsed")
-page_map = {nav_labels[0]: 'single', nav_labels[1]: 'h2h', nav_labels[2]: 'admin'}
+page_map = {nav_labels[0]: 'single', nav_labels[1]: 'h2h', nav_labels[2]: 'lineups', nav_labels[3]: 'admin'}
 st.session_state['page'] = page_map[selected_nav]
 
-df = load_data()
-players_list = []
-if 'temp_new_players' not in st.session_state: st.session_state['temp_new_players'] = []
+# Stages timed on this thread from here on are this rerun's timings
+rerun_timings = rs.METRICS.begin_run()
+rerun_t0 = time.perf_counter()
+try:
+    with rs.METRICS.stage('load'):
+        ds = load_store().current()
+except Exception as e:
+    st.error(f"Data Error: {e}")
+    st.stop()
+df = ds.df
+players_list = ds.roster()
 
-if not df.empty:
-    all_p = pd.unique(df[[f'R{i}' for i in range(1, 23)]].values.ravel('K'))
-    combined = list(set(list(all_p) + st.session_state['temp_new_players']))
-    players_list = [p for p in combined if p and str(p).lower() != 'nan' and str(p).lower() != 'none']
-    players_list.sort()
-
-df_f = df.copy()
 s_sea = 'All Time'
 s_comp = 'All Competitions'
 
@@ -140,13 +189,13 @@ if st.session_state['page'] != 'admin':
     st.sidebar.markdown("<div class='filter-box'>", unsafe_allow_html=True)
     st.sidebar.caption("GLOBAL FILTERS")
     seasons = ['All Time'] + sorted(df['Tag Season'].unique().tolist(), reverse=True) if not df.empty else []
-    s_sea = st.sidebar.selectbox("Season", seasons)
+    s_sea = st.sidebar.selectbox("Season", seasons) or 'All Time'
     comps = ['All Competitions'] + sorted(df['Competition'].unique().tolist()) if not df.empty else []
-    s_comp = st.sidebar.selectbox("Competition", comps)
+    s_comp = st.sidebar.selectbox("Competition", comps) or 'All Competitions'
     st.sidebar.markdown("</div>", unsafe_allow_html=True)
+    with rs.METRICS.stage('filter'):
+        ds.mask(s_sea, s_comp)
     
-    if s_sea != 'All Time': df_f = df_f[df_f['Tag Season'] == s_sea]
-    if s_comp != 'All Competitions': df_f = df_f[df_f['Competition'] == s_comp]
 
 # ==========================================
 # 4. MAIN AREA CONTENT
@@ -163,7 +212,7 @@ if st.session_state['page'] == 'single':
         
         with c_search:
             if 'ps' not in st.session_state: st.session_state.ps = players_list[0]
-            sel_p = st.selectbox("Search Player", players_list, key='ps', label_visibility="collapsed")
+            sel_p = player_picker("Search Player", 'ps')
             
         with c_rand:
             def pick_rand(): st.session_state.ps = random.choice(players_list)
@@ -171,43 +220,27 @@ if st.session_state['page'] == 'single':
         st.markdown("</div>", unsafe_allow_html=True)
 
         # --- STATS CALC ---
-        starter_cols = [f'R{i}' for i in range(1, 12)]
-        sub_cols = [f'R{i}' for i in range(12, 23)]
-        mask = df_f[starter_cols + sub_cols].isin([sel_p]).any(axis=1)
-        p_df = df_f[mask].copy()
+        with rs.METRICS.stage('stats', player=sel_p):
+            p_df = rs.player_matches(ds, sel_p, s_sea, s_comp)
+            summary = rs.player_summary(ds, sel_p, s_sea, s_comp) if not p_df.empty else None
+        if not p_df.empty:
+            # Only selections with data are worth warming
+            load_store().record_view(sel_p, s_sea, s_comp)
 
         if not p_df.empty:
-            p_df['Role'] = p_df.apply(lambda x: 'Starter' if sel_p in x[starter_cols].values else 'Sub', axis=1)
-            starts = len(p_df[p_df['Role'] == 'Starter'])
-            subs = len(p_df[p_df['Role'] == 'Sub'])
-            wins = len(p_df[p_df['ResultCode'] == 'W'])
+            starts = summary['Starts']
+            subs = summary['Subs']
+            wins = summary['W']
             total = starts + subs
-            win_rate = (wins/total*100) if total else 0
-            
+            win_rate = summary['Win Rate']
+
             # PARTNERSHIP CALCULATION (For header summary)
             best_partner_txt = "No partnership data yet"
-            if starts > 0:
-                start_games = p_df[p_df['Role'] == 'Starter']
-                teammate_data = []
-                for idx, row in start_games.iterrows():
-                    res = row['ResultCode']
-                    team_in_match = row[[f'R{i}' for i in range(1, 12)]].values
-                    for mate in team_in_match:
-                        if mate and str(mate) != 'nan' and mate != sel_p:
-                            teammate_data.append({'Teammate': mate, 'Result': res})
-                
-                if teammate_data:
-                    tm_df = pd.DataFrame(teammate_data)
-                    tm_stats = tm_df.groupby('Teammate').agg(Apps=('Result', 'count'), Wins=('Result', lambda x: (x == 'W').sum())).reset_index()
-                    tm_stats['WinRate'] = tm_stats['Wins'] / tm_stats['Apps'] * 100
-                    # Filter for meaningful partnerships (>5 games) unless none exist
-                    meaningful = tm_stats[tm_stats['Apps'] >= 5]
-                    if meaningful.empty: meaningful = tm_stats
-                    
-                    # Get Best (Highest Win Rate, then Most Apps)
-                    if not meaningful.empty:
-                        best = meaningful.sort_values(['WinRate', 'Apps'], ascending=[False, False]).iloc[0]
-                        best_partner_txt = f"{best['Teammate']} ({best['Apps']} gms, {best['WinRate']:.1f}% win rate)"
+            with rs.METRICS.stage('partnerships', player=sel_p):
+                tm_stats = rs.partnership_table(ds, sel_p, s_sea, s_comp)
+            best = summary['Best Partner']
+            if best is not None:
+                best_partner_txt = f"{best['Teammate']} ({best['Apps']} gms, {best['WinRate']:.1f}% win rate)"
 
             # --- HEADER & SUMMARY ---
             col_head_L, col_head_R = st.columns([3, 1])
@@ -228,93 +261,128 @@ if st.session_state['page'] == 'single':
             m4.metric("Win Rate", f"{win_rate:.1f}%")
 
             st.markdown("<br>", unsafe_allow_html=True)
-            tab1, tab2, tab3, tab4 = st.tabs(["📊 Dashboard", "🏆 Performance", "📜 Match Log", "🤝 Connections"])
+            # Only the selected tab runs; switching tabs reruns the script
+            tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Dashboard", "🏆 Performance", "📜 Match Log", "🤝 Connections", "🆚 Opponents & Venues"], key='player_tab', on_change='rerun')
+            fig_key = (sel_p, s_sea, s_comp)
 
             # --- TAB 1: OVERVIEW ---
             with tab1:
-                g1, g2 = st.columns(2)
-                with g1:
-                    st.markdown("##### Overall Record")
-                    fig = go.Figure(data=[go.Pie(labels=['Wins','Draws','Losses'], values=[wins, len(p_df[p_df['ResultCode']=='D']), len(p_df[p_df['ResultCode']=='L'])], hole=.6, marker=dict(colors=['#1b458f','#e0e0e0','#d61a21']))])
-                    fig.update_layout(height=300, margin=dict(t=0,b=0,l=0,r=0), showlegend=True)
-                    st.plotly_chart(fig, use_container_width=True)
-                with g2:
-                    st.markdown("##### Role Timeline")
-                    fig2 = px.histogram(p_df, x='Date', color='Role', color_discrete_map={'Starter':'#1b458f','Sub':'#d61a21'}, nbins=20)
-                    fig2.update_layout(height=300, bargap=0.2, margin=dict(t=20,b=0,l=0,r=0))
-                    st.plotly_chart(fig2, use_container_width=True)
+                if tab1.open:
+                    g1, g2 = st.columns(2)
+                    with g1:
+                        st.markdown("##### Overall Record")
+                        def build_pie():
+                            fig = go.Figure(data=[go.Pie(labels=['Wins','Draws','Losses'], values=[wins, summary['D'], summary['L']], hole=.6, marker=dict(colors=['#1b458f','#e0e0e0','#d61a21']))])
+                            fig.update_layout(height=300, margin=dict(t=0,b=0,l=0,r=0), showlegend=True)
+                            return fig
+                        show_figure(('record',) + fig_key, build_pie)
+                    with g2:
+                        st.markdown("##### Role Timeline")
+                        def build_roles():
+                            fig2 = px.histogram(p_df, x='Date', color='Role', color_discrete_map={'Starter':'#1b458f','Sub':'#d61a21'}, nbins=20)
+                            fig2.update_layout(height=300, bargap=0.2, margin=dict(t=20,b=0,l=0,r=0))
+                            return fig2
+                        show_figure(('roles',) + fig_key, build_roles)
 
             # --- TAB 2: PERFORMANCE (NEW) ---
             with tab2:
-                col_trend, col_comp = st.columns(2)
+                if tab2.open:
+                    col_trend, col_comp = st.columns(2)
                 
-                with col_trend:
-                    st.markdown("##### 📈 Performance Timeline")
-                    # Group by Season
-                    p_df['IsWin'] = p_df['ResultCode'] == 'W'
-                    season_stats = p_df.groupby('Tag Season').agg(
-                        Games=('ResultCode', 'count'),
-                        Wins=('IsWin', 'sum')
-                    ).reset_index()
-                    season_stats['Win Rate'] = (season_stats['Wins'] / season_stats['Games']) * 100
-                    # Sort by Season (assuming standard format YYYY/YY, simple sort works roughly, or use Date min)
-                    # Better: Sort by 'Games' count or explicit Season order if known? Let's use alphabetical for now as 2024/25 > 2023/24
-                    season_stats = season_stats.sort_values('Tag Season') 
-                    
-                    fig_trend = px.line(season_stats, x='Tag Season', y='Win Rate', markers=True, 
-                                        title="Win Rate % per Season",
-                                        color_discrete_sequence=['#1b458f'])
-                    fig_trend.update_layout(yaxis_range=[0, 100], height=350)
-                    st.plotly_chart(fig_trend, use_container_width=True)
-
-                with col_comp:
-                    st.markdown("##### 🏆 By Competition")
-                    comp_stats = p_df.groupby('Competition').agg(
-                        Games=('ResultCode', 'count'),
-                        Wins=('IsWin', 'sum')
-                    ).reset_index()
-                    comp_stats['Win Rate'] = (comp_stats['Wins'] / comp_stats['Games']) * 100
-                    comp_stats = comp_stats.sort_values('Win Rate', ascending=True)
-                    
-                    fig_comp = px.bar(comp_stats, x='Win Rate', y='Competition', orientation='h', 
-                                      text='Games', title="Win Rate (Total Games)",
-                                      color_discrete_sequence=['#d61a21'])
-                    fig_comp.update_traces(texttemplate='%{text} games', textposition='inside')
-                    fig_comp.update_layout(xaxis_range=[0, 100], height=350)
-                    st.plotly_chart(fig_comp, use_container_width=True)
+                    with col_trend:
+                        st.markdown("##### 📈 Performance Timeline")
+                        def build_trend():
+                            season_stats = rs.season_breakdown(ds, sel_p, s_sea, s_comp)
+                            fig_trend = px.line(season_stats, x='Tag Season', y='Win Rate', markers=True, 
+                                                title="Win Rate % per Season",
+                                                color_discrete_sequence=['#1b458f'])
+                            fig_trend.update_layout(yaxis_range=[0, 100], height=350)
+                            return fig_trend
+                        show_figure(('trend',) + fig_key, build_trend)
+
+                    with col_comp:
+                        st.markdown("##### 🏆 By Competition")
+                        def build_comp():
+                            comp_stats = rs.competition_breakdown(ds, sel_p, s_sea, s_comp)
+                            fig_comp = px.bar(comp_stats, x='Win Rate', y='Competition', orientation='h', 
+                                              text='Games', title="Win Rate (Total Games)",
+                                              color_discrete_sequence=['#d61a21'])
+                            fig_comp.update_traces(texttemplate='%{text} games', textposition='inside')
+                            fig_comp.update_layout(xaxis_range=[0, 100], height=350)
+                            return fig_comp
+                        show_figure(('by_comp',) + fig_key, build_comp)
+
+                    st.markdown("##### 🔥 Streaks & Form")
+                    run = rs.player_streaks(ds, sel_p, s_sea, s_comp)
+                    if run is not None:
+                        f1, f2, f3, f4 = st.columns(4)
+                        span = lambda k: f"{run[k + ' From']:%d %b %Y} – {run[k + ' To']:%d %b %Y}" if pd.notna(run[k + ' From']) else None
+                        f1.metric("Longest Unbeaten", run['Longest Unbeaten'], help=span('Unbeaten'))
+                        f2.metric("Longest Winning Run", run['Longest Winning'], help=span('Winning'))
+                        f3.metric("Current Unbeaten", run['Current Unbeaten'])
+                        f4.metric(f"Form (last {rs.FORM_WINDOW})", f"{run['Form']:.0f}%" if pd.notna(run['Form']) else "-")
+                        def build_form():
+                            fig_form = px.line(rs.rolling_form(ds, sel_p, rs.FORM_WINDOW, s_sea, s_comp), x='Date', y='Form',
+                                               hover_data=['Opponent', 'Result'],
+                                               title=f"Win Rate % over the last {rs.FORM_WINDOW} appearances",
+                                               color_discrete_sequence=['#1b458f'])
+                            fig_form.update_layout(yaxis_range=[0, 100], height=300)
+                            return fig_form
+                        show_figure(('form',) + fig_key, build_form)
 
             # --- TAB 3: MATCH LOG ---
             with tab3:
-                cols = ['Date', 'Opponent', 'Competition', 'Score (Rangers First)', 'Win/Lose/Draw', 'Role']
-                v_cols = [c for c in cols if c in p_df.columns]
-                st.dataframe(
-                    p_df[v_cols], 
-                    use_container_width=True, 
-                    hide_index=True, 
-                    column_config={
-                        "Score (Rangers First)": st.column_config.TextColumn("Score"),
-                        "Date": st.column_config.DateColumn("Match Date", format="DD/MM/YYYY")
-                    }
-                )
+                if tab3.open:
+                    cols = ['Date', 'Opponent', 'Competition', 'Score (Rangers First)', 'Win/Lose/Draw', 'Role']
+                    v_cols = [c for c in cols if c in p_df.columns]
+                    st.dataframe(
+                        p_df[v_cols], 
+                        use_container_width=True, 
+                        hide_index=True, 
+                        column_config={
+                            "Score (Rangers First)": st.column_config.TextColumn("Score"),
+                            "Date": st.column_config.DateColumn("Match Date", format="DD/MM/YYYY")
+                        }
+                    )
 
             # --- TAB 4: CONNECTIONS ---
             with tab4:
-                st.markdown("##### Partnership Ranking (Starts Together)")
-                # We calculated meaningful stats above for the summary, let's re-display the full table here
-                if starts > 0 and 'tm_stats' in locals():
+                if tab4.open:
+                    st.markdown("##### Partnership Ranking (Starts Together)")
+                    # We calculated meaningful stats above for the summary, let's re-display the full table here
+                    if not tm_stats.empty:
+                        st.dataframe(
+                            tm_stats,
+                            use_container_width=True,
+                            hide_index=True,
+                            column_config={
+                                "Teammate": st.column_config.TextColumn("Teammate", width="medium"),
+                                "Apps": st.column_config.NumberColumn("Games Together", format="%d"),
+                                "Wins": st.column_config.NumberColumn("Wins Together", format="%d"),
+                                "WinRate": st.column_config.ProgressColumn("Chemistry (Win %)", format="%.1f%%", min_value=0, max_value=100)
+                            }
+                        )
+                    else:
+                        st.info("No data available.")
+
+            # --- TAB 5: OPPONENTS & VENUES ---
+            with tab5:
+                if tab5.open:
+                    venues = rs.venue_splits(ds, sel_p, s_sea, s_comp)
+                    v_cols = st.columns(max(len(venues), 1))
+                    for col, (_, v) in zip(v_cols, venues.iterrows()):
+                        col.metric(f"{v['Venue']} Win Rate", f"{v['Win Rate']:.1f}%", help=f"{v['Games']} games: {v['W']}W {v['D']}D {v['L']}L")
+                    venue = st.selectbox("Venue", [rs.ALL_VENUES] + list(venues['Venue']), key='split_venue')
+                    st.markdown("##### Record by Opponent")
                     st.dataframe(
-                        tm_stats,
+                        rs.opponent_splits(ds, sel_p, s_sea, s_comp, venue),
                         use_container_width=True,
                         hide_index=True,
                         column_config={
-                            "Teammate": st.column_config.TextColumn("Teammate", width="medium"),
-                            "Apps": st.column_config.NumberColumn("Games Together", format="%d"),
-                            "Wins": st.column_config.NumberColumn("Wins Together", format="%d"),
-                            "WinRate": st.column_config.ProgressColumn("Chemistry (Win %)", format="%.1f%%", min_value=0, max_value=100)
+                            "Games": st.column_config.NumberColumn("Games", format="%d"),
+                            "Win Rate": st.column_config.ProgressColumn("Win %", format="%.1f%%", min_value=0, max_value=100)
                         }
                     )
-                else:
-                    st.info("No data available.")
 
         else:
             st.warning(f"No data found for **{sel_p}** with current filters.")
@@ -332,12 +400,8 @@ elif st.session_state['page'] == 'h2h':
         def h2h_rand_p2(): st.session_state.h2h_p2 = random.choice(players_list)
         def h2h_rand_teammate():
             p1_current = st.session_state.h2h_p1
-            mask = df_f[[f'R{i}' for i in range(1, 23)]].isin([p1_current]).any(axis=1)
-            games = df_f[mask]
-            if not games.empty:
-                all_p = games[[f'R{i}' for i in range(1, 23)]].values.ravel()
-                mates = [p for p in all_p if pd.notna(p) and p != p1_current and str(p) != 'nan']
-                mates = list(set(mates))
+            if rs.h2h_stats(ds, p1_current, s_sea, s_comp)['Total']:
+                mates = rs.teammates(ds, p1_current, s_sea, s_comp)
                 if mates: st.session_state.h2h_p2 = random.choice(mates)
                 else: st.toast("No teammates found.")
             else: st.toast("Player has no matches.")
@@ -345,10 +409,10 @@ elif st.session_state['page'] == 'h2h':
         st.markdown("<div class='control-bar'>", unsafe_allow_html=True)
         col_sel1, col_sel2 = st.columns(2)
         with col_sel1:
-            st.selectbox("Player 1", players_list, key='h2h_p1', label_visibility="collapsed")
+            player_picker("Player 1", 'h2h_p1')
             st.button("🔀 Random Player 1", on_click=h2h_rand_p1, use_container_width=True)
         with col_sel2:
-            st.selectbox("Player 2", players_list, key='h2h_p2', label_visibility="collapsed")
+            player_picker("Player 2", 'h2h_p2')
             c_r1, c_r2 = st.columns(2)
             c_r1.button("🔀 Random P2", on_click=h2h_rand_p2, use_container_width=True)
             c_r2.button("🤝 Random Teammate", on_click=h2h_rand_teammate, use_container_width=True)
@@ -359,26 +423,14 @@ elif st.session_state['page'] == 'h2h':
 
         if p1 == p2: st.error("Select different players.")
         else:
-            def get_h2h_stats(p):
-                msk = df_f[[f'R{i}' for i in range(1, 23)]].isin([p]).any(axis=1)
-                d = df_f[msk]
-                w = len(d[d['ResultCode']=='W'])
-                starts = len(d[d[[f'R{i}' for i in range(1, 12)]].isin([p]).any(axis=1)])
-                return {'Total': len(d), 'Wins': w, 'Starts': starts, 'Win Rate': (w/len(d)*100) if len(d) else 0}
-            
-            def get_partnership_chem(pA, pB):
-                starters = [f'R{i}' for i in range(1, 12)]
-                mask_A = df_f[starters].isin([pA]).any(axis=1)
-                mask_B = df_f[starters].isin([pB]).any(axis=1)
-                combined = df_f[mask_A & mask_B]
-                total = len(combined)
-                wins = len(combined[combined['ResultCode'] == 'W'])
-                rate = (wins/total*100) if total > 0 else 0
-                return total, rate
-
-            s1 = get_h2h_stats(p1)
-            s2 = get_h2h_stats(p2)
-            chem_games, chem_rate = get_partnership_chem(p1, p2)
+            with rs.METRICS.stage('stats', player=p1, other=p2):
+                s1 = rs.h2h_stats(ds, p1, s_sea, s_comp)
+                s2 = rs.h2h_stats(ds, p2, s_sea, s_comp)
+            for p, s in ((p1, s1), (p2, s2)):
+                if s['Total']:
+                    load_store().record_view(p, s_sea, s_comp)
+            with rs.METRICS.stage('partnerships', player=p1, other=p2):
+                chem_games, chem_rate = rs.partnership_chem(ds, p1, p2, s_sea, s_comp)
 
             m1, m2, m3 = st.columns(3)
             with m1:
@@ -390,12 +442,14 @@ elif st.session_state['page'] == 'h2h':
                 st.metric("Win Rate", f"{s2['Win Rate']:.1f}%", delta=f"{s2['Win Rate']-s1['Win Rate']:.1f}%")
                 st.metric("Total Apps", s2['Total'], delta=s2['Total']-s1['Total'])
             with m2:
-                categories = ['Total Apps', 'Wins', 'Starts', 'Win Rate']
-                fig = go.Figure()
-                fig.add_trace(go.Scatterpolar(r=[s1['Total'], s1['Wins'], s1['Starts'], s1['Win Rate']], theta=categories, fill='toself', name=p1, line_color='#1b458f'))
-                fig.add_trace(go.Scatterpolar(r=[s2['Total'], s2['Wins'], s2['Starts'], s2['Win Rate']], theta=categories, fill='toself', name=p2, line_color='#d61a21'))
-                fig.update_layout(polar=dict(radialaxis=dict(visible=True)), showlegend=False, height=250, margin=dict(t=20,b=20,l=20,r=20))
-                st.plotly_chart(fig, use_container_width=True)
+                def build_radar():
+                    categories = ['Total Apps', 'Wins', 'Starts', 'Win Rate']
+                    fig = go.Figure()
+                    fig.add_trace(go.Scatterpolar(r=[s1['Total'], s1['Wins'], s1['Starts'], s1['Win Rate']], theta=categories, fill='toself', name=p1, line_color='#1b458f'))
+                    fig.add_trace(go.Scatterpolar(r=[s2['Total'], s2['Wins'], s2['Starts'], s2['Win Rate']], theta=categories, fill='toself', name=p2, line_color='#d61a21'))
+                    fig.update_layout(polar=dict(radialaxis=dict(visible=True)), showlegend=False, height=250, margin=dict(t=20,b=20,l=20,r=20))
+                    return fig
+                show_figure(('radar', p1, p2, s_sea, s_comp), build_radar)
 
             st.markdown("---")
             st.subheader("🔗 Partnership Analysis")
@@ -403,16 +457,80 @@ elif st.session_state['page'] == 'h2h':
             c_chem1, c_chem2 = st.columns(2)
             c_chem1.metric("Games Started Together", chem_games)
             c_chem2.metric("Win Rate as Duo", f"{chem_rate:.1f}%")
-            if chem_games > 0: st.progress(chem_rate / 100)
+            if chem_games > 0:
+                st.progress(chem_rate / 100)
+                c_ven, c_opp = st.columns(2)
+                with c_ven:
+                    st.markdown("##### By Venue")
+                    st.dataframe(rs.partnership_splits(ds, p1, p2, 'Venue', s_sea, s_comp), use_container_width=True, hide_index=True,
+                                 column_config={"Win Rate": st.column_config.NumberColumn("Win %", format="%.1f%%")})
+                with c_opp:
+                    st.markdown("##### By Opponent")
+                    st.dataframe(rs.partnership_splits(ds, p1, p2, 'Opponent', s_sea, s_comp), use_container_width=True, hide_index=True, height=250,
+                                 column_config={"Win Rate": st.column_config.NumberColumn("Win %", format="%.1f%%")})
             else: st.caption("No games started together.")
 
+# --- LINEUPS ---
+elif st.session_state['page'] == 'lineups':
+    st.markdown("<h1>🧩 Lineups</h1>", unsafe_allow_html=True)
+    if df.empty:
+        st.info("👋 Welcome! The database is empty. Go to the **Admin Panel** to add data.")
+    else:
+        # Sizes are mined from any starters; named units come from fixed lineup slots
+        queries = {"Trios": 3, "Fours": 4, "Back Fours": 'Back Four', "Starting XIs": 'Starting XI'}
+        st.markdown("<div class='control-bar'>", unsafe_allow_html=True)
+        c_q, c_min, c_sort = st.columns([2, 1, 1])
+        query = c_q.selectbox("Combination", list(queries), key='lu_query')
+        min_games = c_min.number_input("Min Games Together", min_value=5, value=rs.MIN_LINEUP_GAMES, step=5, key='lu_min')
+        rank_by = c_sort.selectbox("Rank By", ["Games", "Win Rate"], key='lu_rank')
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        q = queries[query]
+        with rs.METRICS.stage('lineups', query=query):
+            if isinstance(q, int):
+                combos = rs.lineup_combinations(ds, q, min_games, s_sea, s_comp)
+            else:
+                combos = rs.lineup_units(ds, q, min_games, s_sea, s_comp)
+        st.caption(f"Analyzing: {s_sea} • {s_comp} • {len(combos)} combinations with {min_games}+ starts together")
+
+        if not combos.empty:
+            st.dataframe(
+                combos.sort_values([rank_by, 'Games'], ascending=False).head(100),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Players": st.column_config.TextColumn("Players", width="large"),
+                    "Games": st.column_config.NumberColumn("Games Together", format="%d"),
+                    "Wins": st.column_config.NumberColumn("Wins Together", format="%d"),
+                    "Win Rate": st.column_config.ProgressColumn("Win Rate", format="%.1f%%", min_value=0, max_value=100)
+                }
+            )
+        else:
+            st.info("No combinations meet the minimum games with current filters.")
+
 # --- ADMIN PANEL ---
 elif st.session_state['page'] == 'admin':
     st.markdown("<h1>🔒 Admin Panel</h1>", unsafe_allow_html=True)
     if check_password():
         st.success("Authenticated")
-        
-        tab_add, tab_edit = st.tabs(["➕ Add Match", "✏️ Edit Fixture"])
+        if ds.errors:
+            with st.expander(f"⚠️ {len(ds.errors)} problem rows in {DATA_FILE}"):
+                st.dataframe([e._asdict() for e in ds.errors], hide_index=True, use_container_width=True)
+
+        with st.expander("⏱️ Performance"):
+            st.caption("Stage latency over the most recent runs (ms), and memo lookups per table, since startup or the last reset.")
+            st.dataframe(rs.METRICS.stage_summary(), hide_index=True, use_container_width=True,
+                         column_config={c: st.column_config.NumberColumn(c, format="%.1f") for c in ['Mean ms', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms']})
+            st.dataframe(rs.METRICS.cache_summary(), hide_index=True, use_container_width=True,
+                         column_config={"Hit Rate": st.column_config.NumberColumn("Hit Rate", format="%.1f%%")})
+            pf1, pf2 = st.columns([3, 1])
+            pf1.checkbox("Show this rerun's timings in the sidebar on every page", key='timing_overlay')
+            if pf2.button("Reset Metrics"):
+                rs.METRICS.reset()
+                st.rerun()
+            if rs.METRICS.path: st.caption(f"Also written to `{rs.METRICS.path}`.")
+
+        tab_add, tab_edit, tab_bulk = st.tabs(["➕ Add Match", "✏️ Edit Fixture", "📦 Bulk Edit"])
         
         # ADD MATCH
         with tab_add:
@@ -441,11 +559,28 @@ elif st.session_state['page'] == 'admin':
             st.markdown("---")
             with st.expander("🆕 Register New Player (If not in list)"):
                 np_col1, np_col2 = st.columns([3,1])
-                new_p = np_col1.text_input("Name", placeholder="e.g. J. Butland", label_visibility="collapsed")
-                if np_col2.button("Add Player"):
-                    if new_p and new_p not in players_list:
-                        st.session_state['temp_new_players'].append(new_p)
+                new_p = np_col1.text_input("Name", placeholder="e.g. J. Butland", label_visibility="collapsed").strip()
+                similar = rs.similar_players(ds, new_p) if new_p else []
+                exact = [p for p, _ in similar if rs.normalize_name(p) == rs.normalize_name(new_p)]
+                if exact:
+                    st.error(f"Already registered as **{exact[0]}**.")
+                elif similar:
+                    st.warning("Possible duplicate of: " + ", ".join(f"**{p}**" for p, _ in similar[:5]))
+                    confirm = st.checkbox("This is a different player")
+                else:
+                    confirm = True
+                if np_col2.button("Add Player", disabled=not new_p or bool(exact) or not confirm):
+                    if register_player(new_p):
                         st.rerun()
+
+            with st.expander("🔗 Merge Duplicate Players"):
+                st.caption("Lineups keep their original spelling; the duplicate becomes an alias and its stats move to the kept player.")
+                mg_col1, mg_col2 = st.columns(2)
+                keep_p = mg_col1.selectbox("Keep", players_list, key='merge_keep')
+                dup_p = mg_col2.selectbox("Duplicate", [p for p in players_list if p != keep_p], key='merge_dup')
+                if st.button("Merge Players") and dup_p:
+                    if merge_players(keep_p, dup_p):
+                        st.success(f"Merged {dup_p} into {keep_p}.")
             
             st.markdown("##### Team Sheet")
             sc1, sc2 = st.columns(2)
@@ -465,41 +600,86 @@ elif st.session_state['page'] == 'admin':
                     st.error("Please fill in all Match Details (Opponent, Score, Comp, Season).")
                 else:
                     row = {
-                        'Day': inp_date.day, 'Month': inp_date.month, 'Year': inp_date.year,
+                        'Day': inp_date.day, 'Month': inp_date.strftime('%B'), 'Year': inp_date.year,
                         'Opponent': inp_opp, 'Competition': inp_comp, 
                         'Score (Rangers First)': inp_score, 'Win/Lose/Draw': inp_res, 'Tag Season': inp_sea
                     }
                     for k,v in selections.items(): row[k] = v if v else None
                     
-                    df_cur = pd.read_csv(DATA_FILE)
-                    df_final = pd.concat([df_cur, pd.DataFrame([row])], ignore_index=True)
-                    if save_data(df_final):
+                    if append_match(row):
                         st.success("Match Saved!")
-                        st.session_state['temp_new_players'] = []
             st.markdown("</div>", unsafe_allow_html=True)
 
         # EDIT FIXTURE
         with tab_edit:
             st.markdown("<div class='control-bar'>", unsafe_allow_html=True)
             if not df.empty:
-                df['Label'] = df['Date'].dt.strftime('%Y-%m-%d') + " vs " + df['Opponent']
-                target = st.selectbox("Select Match to Edit", df['Label'].unique())
+                keys = ds.memo(('match_keys',), lambda: rs.match_keys(df))
+                target = st.selectbox("Select Match to Edit", keys)
                 if target:
-                    orig = df[df['Label'] == target].iloc[0]
+                    orig = df[keys == target].iloc[0]
                     ed1, ed2 = st.columns(2)
                     new_d = ed1.date_input("Correct Date", orig['Date'])
                     new_o = ed2.text_input("Correct Opponent", orig['Opponent'])
                     
                     if st.button("Update Info"):
-                        raw = pd.read_csv(DATA_FILE)
-                        m = (raw['Day']==orig['Day']) & (raw['Month']==orig['Month']) & (raw['Year']==orig['Year']) & (raw['Opponent']==orig['Opponent'])
-                        if m.any():
-                            idx = raw[m].index[0]
-                            raw.at[idx, 'Day'] = new_d.day
-                            raw.at[idx, 'Month'] = new_d.month
-                            raw.at[idx, 'Year'] = new_d.year
-                            raw.at[idx, 'Opponent'] = new_o
-                            if save_data(raw): st.success("Updated.")
-                        else: st.error("Record not found.")
+                        edit = {rs.KEY_COL: target, 'Day': new_d.day, 'Month': new_d.strftime('%B'), 'Year': new_d.year, 'Opponent': new_o}
+                        if upsert_fixtures(pd.DataFrame([edit])): st.success("Updated.")
+            else: st.info("No matches.")
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        # BULK EDIT
+        with tab_bulk:
+            st.markdown("<div class='control-bar'>", unsafe_allow_html=True)
+            st.caption(f"Rows are matched on **{rs.KEY_COL}** (date and opponent, e.g. `2025-11-09 Dundee`); rows without one are matched on their own date and opponent. "
+                       "Matched fixtures are updated, the rest added, all in one save. A Match Key that no longer exists (the fixture was edited since) is rejected.")
+            st.subheader("Upload CSV")
+            upload = st.file_uploader("Fixtures CSV (same columns as the match data)", type='csv')
+            if upload is not None:
+                try:
+                    batch = pd.read_csv(upload)
+                except Exception as e:
+                    st.error(f"Could not read the file: {e}")
+                else:
+                    st.caption(f"{len(batch):,} rows")
+                    st.dataframe(batch.head(20), hide_index=True, use_container_width=True)
+                    if st.button("Apply Upload"):
+                        done = upsert_fixtures(batch)
+                        if done: st.success(f"{done['updated']} updated, {done['inserted']} added.")
+
+            st.markdown("---")
+            st.subheader("Edit Grid")
+            if not df.empty:
+                grid_seasons = sorted(df['Tag Season'].dropna().unique().tolist(), reverse=True)
+                grid_sea = st.selectbox("Season to Edit", grid_seasons, key='bulk_season')
+                # The CSV as stored, so saving keeps the original lineup spellings rather than canonical names
+                raw = ds.memo(('raw_csv',), lambda: rs.storage.read_csv(load_store().path))
+                raw_keys = ds.memo(('raw_match_keys',), lambda: rs.match_keys(raw))
+                season_rows = raw[raw['Tag Season'] == grid_sea]
+                grid = season_rows.astype(object).where(season_rows.notna(), None)
+                grid.insert(0, rs.KEY_COL, raw_keys[season_rows.index])
+                grid = grid.reset_index(drop=True)
+                edited = st.data_editor(grid, num_rows="add", hide_index=True, use_container_width=True,
+                                        disabled=[rs.KEY_COL], key=f"bulk_grid_{ds.version}_{grid_sea}")
+                # Only edited and added rows go to the save; emptied cells are sent as '' to clear them
+                as_text = lambda f: f.astype(object).where(f.notna(), '').astype(str)
+                kept = edited.index.intersection(grid.index)
+                diff = (as_text(edited.loc[kept]) != as_text(grid.loc[kept])).any(axis=1)
+                changed = edited.loc[diff.index[diff].append(edited.index.difference(grid.index))]
+                changed = changed[as_text(changed).ne('').any(axis=1)]
+                emptied = as_text(changed).eq('') & as_text(grid.reindex(changed.index)).ne('')
+                changed = changed.astype(object).mask(emptied, '')
+                st.caption(f"{len(changed)} changed or new rows")
+                if st.button("Save Changes", disabled=changed.empty):
+                    done = upsert_fixtures(changed)
+                    if done: st.success(f"{done['updated']} updated, {done['inserted']} added.")
             else: st.info("No matches.")
             st.markdown("</div>", unsafe_allow_html=True)
+
+# ==========================================
+# 5. RERUN TIMINGS (admin only)
+# ==========================================
+rs.METRICS.record('rerun', time.perf_counter() - rerun_t0, page=st.session_state['page'])
+if st.session_state.get('password_correct') and st.session_state.get('timing_overlay'):
+    with st.sidebar.expander("⏱️ This Rerun", expanded=True):
+        st.dataframe([{'Stage': name, 'ms': round(ms, 1)} for name, ms in rerun_timings], hide_index=True, use_container_width=True)
@@ -0,0 +1,41 @@
+"""Headless analytics for the Ibrox Analytics dashboard.
+
+    from rangers_stats import MatchStore, player_summary
+
+    ds = MatchStore("rangers_data.csv").current()
+    player_summary(ds, "John Greig", "All Time", "League")
+"""
+from .batch import STATS_COLUMNS, compute_all, player_stats_table
+from .cube import CUBE_COLS
+from .data import ALL_COMPS, ALL_SEASONS, SLOT_COLS, STARTER_COLS, SUB_COLS, filter_mask, read_matches
+from .dataset import Dataset, MatchStore
+from .export import export_stats, make_server
+from .form import FORM_WINDOW, STREAK_COLUMNS
+from .importer import RowError, import_matches
+from .lineups import LINEUP_UNITS, MIN_LINEUP_GAMES
+from .metrics import METRICS
+from .players import normalize_name
+from .splits import ALL_OPPONENTS, ALL_VENUES
+from .stats import (
+    competition_breakdown,
+    form_by_period,
+    h2h_stats,
+    lineup_combinations,
+    lineup_units,
+    opponent_splits,
+    partnership_chem,
+    partnership_splits,
+    partnership_table,
+    player_matches,
+    player_streaks,
+    player_summary,
+    record_against,
+    rolling_form,
+    search_players,
+    season_breakdown,
+    similar_players,
+    streaks,
+    teammates,
+    venue_splits,
+)
+from .upsert import KEY_COL, match_keys, upsert_matches
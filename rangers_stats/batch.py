@@ -0,0 +1,137 @@
+"""Stats for every player at once, optionally sharded across a process pool.
+
+`player_stats_table` computes the dashboard headline numbers (apps, starts,
+subs, W/D/L, win rate and best partner) for a set of players with array
+operations over their slices of the appearance index; its cost is
+proportional to those players' appearances. `compute_all` runs it in this
+process by default. Asked for more workers, it builds the Dataset and every
+table the shards read (mask, results, starting lineups) in the parent, then
+forks the pool so workers inherit them copy-on-write instead of loading and
+indexing the data again; only the players of each shard and its result rows
+cross the process boundary. Where fork is unavailable it runs serially.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .data import ALL_COMPS, ALL_SEASONS, RESULT_CODES
+from .index import starting_lineups
+from .partnerships import MIN_PARTNER_GAMES
+
+STATS_COLUMNS = ['Player', 'Apps', 'Starts', 'Subs', 'W', 'D', 'L', 'Win Rate',
+                 'Best Partner', 'Best Partner Games', 'Best Partner Win Rate']
+
+_worker_ds = None  # The parent's Dataset, inherited by forked workers
+
+
+def player_stats_table(ds, players=None, s_sea=ALL_SEASONS, s_comp=ALL_COMPS, min_games=MIN_PARTNER_GAMES):
+    """One row per player (all players with appearances by default) in STATS_COLUMNS.
+
+    The best partner follows `best_partner`: highest win rate, then most games,
+    among teammates started alongside at least `min_games` times (or among all
+    of them when none reach it).
+    """
+    index = ds.index
+    pids = np.arange(len(index['players'])) if players is None else np.array(
+        [index['player_id'][p] for p in players if p in index['player_id']], dtype=np.int64)
+    mask, won = ds.mask(s_sea, s_comp), ds.won()
+    result = pd.Categorical(ds.df['ResultCode'], categories=RESULT_CODES).codes
+
+    # This shard's appearances, gathered from its CSR slices
+    lo, hi = index['indptr'][pids], index['indptr'][pids + 1]
+    lengths = hi - lo
+    owner = np.repeat(np.arange(len(pids)), lengths)
+    pos = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    rows, starter = index['rows'][pos], index['starter'][pos]
+    keep = mask[rows]
+    owner, rows, starter = owner[keep], rows[keep], starter[keep]
+
+    count = lambda w=None: np.bincount(owner, weights=w, minlength=len(pids)).astype(np.int64)
+    table = pd.DataFrame({'Player': index['players'][pids], 'Apps': count(), 'Starts': count(starter)})
+    table['Subs'] = table['Apps'] - table['Starts']
+    for code, col in enumerate(RESULT_CODES):
+        table[col] = count(result[rows] == code)
+    table['Win Rate'] = np.where(table['Apps'] > 0, table['W'] / table['Apps'].clip(lower=1) * 100, 0.0)
+
+    # Partners from the starting lineups of this shard's starts
+    lineups = _lineups(ds)
+    s_owner, s_rows = owner[starter], rows[starter]
+    mates = lineups[s_rows]
+    a = np.repeat(s_owner, mates.shape[1])
+    b = mates.ravel()
+    w = np.repeat(won[s_rows], mates.shape[1])
+    ok = (b >= 0) & (b != pids[a])
+    n = len(index['players'])
+    keys, inv = np.unique(a[ok] * n + b[ok], return_inverse=True)
+    games = np.bincount(inv, minlength=len(keys))
+    wins = np.bincount(inv, weights=w[ok], minlength=len(keys)).astype(np.int64)
+    p_owner, partner = np.divmod(keys, n)
+    rate = wins / games * 100
+
+    # Among partners at min_games (or all when a player has none there): best rate, then games, then name
+    meaningful = games >= min_games
+    has_meaningful = np.bincount(p_owner, weights=meaningful, minlength=len(pids)) > 0
+    eligible = meaningful | ~has_meaningful[p_owner]
+    cand = np.flatnonzero(eligible)
+    order = np.lexsort((partner[cand], -games[cand], -rate[cand], p_owner[cand]))
+    cand = cand[order]
+    first = np.ones(len(cand), dtype=bool)
+    first[1:] = p_owner[cand][1:] != p_owner[cand][:-1]
+    best = cand[first]
+
+    best_name = np.full(len(pids), None, dtype=object)
+    best_games = np.zeros(len(pids), dtype=np.int64)
+    best_rate = np.full(len(pids), np.nan)
+    best_name[p_owner[best]] = index['players'][partner[best]]
+    best_games[p_owner[best]] = games[best]
+    best_rate[p_owner[best]] = rate[best]
+    table['Best Partner'] = best_name
+    table['Best Partner Games'] = best_games
+    table['Best Partner Win Rate'] = best_rate
+    return table[STATS_COLUMNS]
+
+
+def shard_players(ds, n_shards):
+    """Split the players into `n_shards` lists of roughly equal total appearances."""
+    apps = np.diff(ds.index['indptr'])
+    bounds = np.searchsorted(np.cumsum(apps), np.linspace(0, apps.sum(), n_shards + 1)[1:-1])
+    return [list(ds.index['players'][part]) for part in np.split(np.arange(len(apps)), bounds) if len(part)]
+
+
+def _lineups(ds):
+    return ds.memo(('starting_lineups',), lambda: starting_lineups(ds.index, len(ds.df)))
+
+
+def _run_shard(players, s_sea, s_comp):
+    return player_stats_table(_worker_ds, players, s_sea, s_comp)
+
+
+def compute_all(path, workers=1, s_sea=ALL_SEASONS, s_comp=ALL_COMPS, shards_per_worker=4):
+    """Stats table for every player in the match CSV at `path`, sorted by Apps.
+
+    With `workers` > 1 (0 or None: one per CPU) the players are sharded across
+    that many forked processes; with 1, or without fork, it runs in this process.
+    """
+    global _worker_ds
+    from .dataset import MatchStore
+    workers = workers or os.cpu_count() or 1
+    ds = MatchStore(path).current()
+    if workers == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        table = player_stats_table(ds, None, s_sea, s_comp)
+    else:
+        # Everything the shards read is built before the fork, so workers only inherit it
+        ds.mask(s_sea, s_comp)
+        ds.won()
+        _lineups(ds)
+        shards = shard_players(ds, workers * shards_per_worker)
+        _worker_ds = ds
+        try:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                parts = list(pool.map(_run_shard, shards, [s_sea] * len(shards), [s_comp] * len(shards)))
+        finally:
+            _worker_ds = None
+        table = pd.concat(parts, ignore_index=True)
+    return table.sort_values(['Apps', 'Player'], ascending=[False, True], ignore_index=True)
@@ -0,0 +1,89 @@
+"""Aggregate cube: appearance totals per player x season x competition."""
+import numpy as np
+import pandas as pd
+
+from .data import ALL_COMPS, ALL_SEASONS, RESULT_CODES
+
+CUBE_COLS = ['Apps', 'Starts', 'Subs', 'W', 'D', 'L']
+
+
+def build_cube(df, index):
+    """Appearance totals per player x season x competition, with rollups.
+
+    Rows are indexed by (Player, Season, Competition); Season also takes
+    ALL_SEASONS and Competition ALL_COMPS, so any sidebar filter
+    combination is a single `.loc` lookup.
+    """
+    pids = np.repeat(np.arange(len(index['players'])), np.diff(index['indptr']))
+    rows, starter = index['rows'], index['starter']
+    sea_codes, seasons = pd.factorize(df['Tag Season'])
+    comp_codes, comps = pd.factorize(df['Competition'])
+    res = pd.Categorical(df['ResultCode'], categories=RESULT_CODES).codes[rows]
+    return rollup_counts(pids, index['players'], (sea_codes[rows], seasons, ALL_SEASONS),
+                         (comp_codes[rows], comps, ALL_COMPS), res, starter, ['Player', 'Season', 'Competition'])
+
+
+def rollup_counts(owner, owners, dim1, dim2, res, starter, names):
+    """CUBE_COLS totals per (owner, dim1, dim2) over a set of appearances, with rollups.
+
+    `owner` indexes `owners`; each dim is `(codes, labels, all_label)` with one
+    code per appearance (-1 when unknown). Both dims also take their
+    `all_label`, so any combination is a single `.loc` lookup. `res` indexes
+    RESULT_CODES and `starter` flags starts. Rows are indexed by `names`.
+    """
+    (d1, labels1, all_label1), (d2, labels2, all_label2) = dim1, dim2
+    all1, all2 = len(labels1), len(labels2)
+
+    # One copy of the appearances per rollup level; unknown codes only count in rollups
+    parts = [(d1, d2), (np.full_like(d1, all1), d2), (d1, np.full_like(d2, all2)),
+             (np.full_like(d1, all1), np.full_like(d2, all2))]
+    keep = [(a >= 0) & (b >= 0) for a, b in parts]
+    a = np.concatenate([p[0][k] for p, k in zip(parts, keep)])
+    b = np.concatenate([p[1][k] for p, k in zip(parts, keep)])
+    take = lambda x: np.concatenate([x[k] for k in keep])
+    keys = (take(owner) * (all1 + 1) + a) * (all2 + 1) + b
+    uniq, inv = np.unique(keys, return_inverse=True)
+    starts = np.bincount(inv, weights=take(starter), minlength=len(uniq)).astype(np.int64)
+    apps = np.bincount(inv, minlength=len(uniq))
+    res = take(res)
+    counts = {'Apps': apps, 'Starts': starts, 'Subs': apps - starts}
+    for code, col in enumerate(RESULT_CODES):
+        counts[col] = np.bincount(inv, weights=res == code, minlength=len(uniq)).astype(np.int64)
+
+    rest, b_codes = np.divmod(uniq, all2 + 1)
+    o_codes, a_codes = np.divmod(rest, all1 + 1)
+    mi = pd.MultiIndex(
+        levels=[pd.Index(owners), pd.Index(list(labels1) + [all_label1]), pd.Index(list(labels2) + [all_label2])],
+        codes=[o_codes, a_codes, b_codes],
+        names=names,
+    )
+    return pd.DataFrame(counts, index=mi)[CUBE_COLS]
+
+
+def player_totals(cube, player, s_sea, s_comp):
+    """Apps/Starts/Subs/W/D/L of `player` under the Season/Competition filters."""
+    try:
+        return cube.loc[(player, s_sea, s_comp)].to_dict()
+    except KeyError:
+        return dict.fromkeys(CUBE_COLS, 0)
+
+
+def player_breakdown(cube, player, by, s_sea, s_comp):
+    """Games, Wins and Win Rate of `player` per season (by='Season') or per competition.
+
+    The other dimension is held at its sidebar filter value.
+    """
+    try:
+        p = cube.xs(player, level='Player')
+    except KeyError:
+        p = cube.iloc[:0].droplevel('Player')
+    seasons, comps = p.index.get_level_values('Season'), p.index.get_level_values('Competition')
+    if by == 'Season':
+        labels, sel = seasons, (comps == s_comp) & (seasons != ALL_SEASONS)
+        if s_sea != ALL_SEASONS: sel &= seasons == s_sea
+    else:
+        labels, sel = comps, (seasons == s_sea) & (comps != ALL_COMPS)
+        if s_comp != ALL_COMPS: sel &= comps == s_comp
+    out = pd.DataFrame({by: labels[sel], 'Games': p['Apps'].to_numpy()[sel], 'Wins': p['W'].to_numpy()[sel]})
+    out['Win Rate'] = out['Wins'] / out['Games'] * 100
+    return out
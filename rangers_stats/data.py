@@ -0,0 +1,95 @@
+"""Parsing, cleaning and compact dtypes for the match frame."""
+import numpy as np
+import pandas as pd
+
+from . import storage
+
+SLOT_COLS = [f'R{i}' for i in range(1, 23)]
+STARTER_COLS = SLOT_COLS[:11]
+SUB_COLS = SLOT_COLS[11:]
+CATEGORY_COLS = ['Opponent', 'Competition', 'Home/Away/Neutral', 'Tag Season', 'Month', 'Win/Lose/Draw']
+RESULT_CODES = ['W', 'D', 'L']
+ALL_SEASONS = 'All Time'
+ALL_COMPS = 'All Competitions'
+DERIVED_COLS = ['DateStr', 'Date', 'ResultCode']
+
+
+def _whole_numbers(col):
+    """`col` as stripped text, with whole numbers written as integers.
+
+    A blank Day or Year makes pandas read the whole column as float; without
+    this every other row of it would become '8.0-November-1873.0'.
+    """
+    num = pd.to_numeric(col, errors='coerce')
+    num = num.where(num % 1 == 0).astype('Int64')
+    return num.astype(str).where(num.notna(), col.astype(str).str.strip())
+
+
+def date_strings(df):
+    """'Day-Month-Year' text of every row of a raw or cleaned frame."""
+    return _whole_numbers(df['Day']) + "-" + df['Month'].astype(str).str.strip() + "-" + _whole_numbers(df['Year'])
+
+
+def clean_matches(df):
+    """Add DateStr/Date/ResultCode and tidy the lineup slots of a raw CSV frame (in place).
+
+    Date parts and player names are stripped and runs of whitespace inside them collapsed, so
+    'John  Greig' and 'John Greig' are the same player.
+    """
+    df['DateStr'] = date_strings(df)
+    df['Date'] = pd.to_datetime(df['DateStr'], errors='coerce')
+    df['ResultCode'] = df['Win/Lose/Draw'].astype(str).str[0].str.upper()
+    if 'Score (Rangers First)' in df.columns:
+        df['Score (Rangers First)'] = df['Score (Rangers First)'].astype(str)
+    for col in SLOT_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace(r'\s+', ' ', regex=True).str.strip().replace('nan', None).replace('None', None)
+    return df
+
+
+def category_groups(columns):
+    """Columns that share one categorical dictionary: each of CATEGORY_COLS alone, all lineup slots together."""
+    slots = [c for c in SLOT_COLS if c in columns]
+    return [[c] for c in CATEGORY_COLS if c in columns] + ([slots] if slots else [])
+
+
+def compact_matches(df):
+    """Categorical dtypes for the repetitive columns of a cleaned frame.
+
+    The 22 lineup slots share one sorted player dictionary and ResultCode uses
+    fixed W/D/L categories, so the frame is mostly int8/int16 codes.
+    """
+    dtypes = {}
+    for group in category_groups(df.columns):
+        values = pd.unique(df[group].to_numpy(dtype=object).ravel())
+        cats = sorted(v for v in values if pd.notna(v) and v != '')
+        dtypes.update(dict.fromkeys(group, pd.CategoricalDtype(cats)))
+    if 'ResultCode' in df.columns:
+        dtypes['ResultCode'] = pd.CategoricalDtype(RESULT_CODES)
+    return df.astype(dtypes)
+
+
+def align_categories(df, new):
+    """Give `df` and `new` the same categorical dtypes, extending `df`'s with values only `new` has."""
+    dtypes = {}
+    for group in category_groups(df.columns):
+        cats = df[group[0]].cat.categories
+        values = pd.unique(new[group].to_numpy(dtype=object).ravel())
+        extra = [v for v in values if pd.notna(v) and v != '' and v not in cats]
+        dtypes.update(dict.fromkeys(group, pd.CategoricalDtype(cats.append(pd.Index(extra)) if extra else cats)))
+    dtypes['ResultCode'] = df['ResultCode'].dtype
+    new = new.astype({c: df[c].dtype for c in new.columns if c in df.columns and c not in dtypes})
+    return df.astype(dtypes), new.astype(dtypes)
+
+
+def read_matches(path):
+    """Parse, clean and compact the CSV at `path`, newest match first."""
+    return compact_matches(clean_matches(storage.read_csv(path))).sort_values('Date', ascending=False)
+
+
+def filter_mask(df, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Boolean row mask over `df` for the global Season/Competition filters."""
+    mask = np.ones(len(df), dtype=bool)
+    if s_sea != ALL_SEASONS: mask &= (df['Tag Season'] == s_sea).to_numpy()
+    if s_comp != ALL_COMPS: mask &= (df['Competition'] == s_comp).to_numpy()
+    return mask
@@ -0,0 +1,317 @@
+"""Versioned match data with memoized derived tables, and the store that serves it."""
+import io
+import os
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from . import snapshot, storage
+from .cube import build_cube
+from .data import ALL_COMPS, ALL_SEASONS, DERIVED_COLS, SLOT_COLS, align_categories, clean_matches, filter_mask
+from .importer import RowError, import_matches
+from .index import build_appearance_index, index_add_match
+from .metrics import METRICS
+from .partnerships import build_partnerships
+from .splits import build_splits
+from .stats import warm_up
+from .upsert import upsert_matches
+from .players import (
+    alias_map,
+    apply_aliases,
+    build_name_index,
+    empty_identities,
+    identity_path,
+    merge_identities,
+    normalize_name,
+    read_identities,
+    spelling_owner,
+    sync_identities,
+    write_identities,
+)
+
+MEMO_SIZE = 256
+FIGURE_MEMO_SIZE = 256
+
+
+class Dataset:
+    """One version of the match data and the tables derived from it.
+
+    A Dataset is never modified after construction; every write produces a new
+    one. Derived tables are memoized on it by `(name, *filters)` keys, so the
+    memo is keyed by data version without having to say so. The memo is shared
+    by every session using the Dataset: concurrent misses on one key build it
+    once while the others wait. Figures have an LRU of their own, so browsing
+    many players' charts never evicts the expensive shared tables.
+    """
+
+    def __init__(self, df, version=0, index=None, memo=None, identities=None, figures=None):
+        self.df = df
+        self.version = version
+        self.index = build_appearance_index(df) if index is None else index
+        if identities is None:
+            identities, _ = sync_identities(empty_identities(), self.index['players'])
+        self.identities = identities
+        self._memo = OrderedDict(memo or ())
+        self._figures = OrderedDict(figures or ())
+        self._memo_lock = threading.Lock()
+        self._building = {}
+
+    def memo(self, key, build):
+        """Return the value memoized under `key`, building it with `build()` on a miss."""
+        return self._lookup(self._memo, MEMO_SIZE, key, build)
+
+    def figure(self, key, build):
+        """Like `memo`, for a chart: kept in the separate figure LRU under ('figure', *key)."""
+        return self._lookup(self._figures, FIGURE_MEMO_SIZE, ('figure',) + key, build)
+
+    def _lookup(self, cache, size, key, build):
+        with self._memo_lock:
+            if key in cache:
+                cache.move_to_end(key)
+                METRICS.cache(key[0], 'hit')
+                return cache[key]
+            done = self._building.get(key)
+            if done is None:
+                self._building[key] = threading.Event()
+        METRICS.cache(key[0], 'miss' if done is None else 'wait')
+        if done is not None:
+            done.wait()
+            with self._memo_lock:
+                if key in cache:
+                    return cache[key]
+            return build()  # The first builder failed, or the entry was already evicted
+        try:
+            with METRICS.stage(f'build:{key[0]}'):
+                value = build()
+            with self._memo_lock:
+                cache[key] = value
+                while len(cache) > size:
+                    cache.popitem(last=False)
+            return value
+        finally:
+            with self._memo_lock:
+                self._building.pop(key).set()
+
+    def mask(self, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+        return self.memo(('mask', s_sea, s_comp), lambda: filter_mask(self.df, s_sea, s_comp))
+
+    def won(self):
+        return self.memo(('won',), lambda: (self.df['ResultCode'] == 'W').to_numpy())
+
+    def partnerships(self, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+        return self.memo(('partnerships', s_sea, s_comp),
+                         lambda: build_partnerships(self.index, self.mask(s_sea, s_comp), self.won()))
+
+    def splits(self, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+        return self.memo(('splits', s_sea, s_comp),
+                         lambda: build_splits(self.df, self.index, self.mask(s_sea, s_comp)))
+
+    def cube(self):
+        return self.memo(('cube',), lambda: build_cube(self.df, self.index))
+
+    @property
+    def errors(self):
+        """RowErrors found when the CSV was imported."""
+        return [RowError(*e) for e in self.df.attrs.get('import_errors', [])]
+
+    def players(self):
+        """Every player with at least one appearance, sorted."""
+        return self.memo(('players',), lambda: sorted(self.index['players']))
+
+    def roster(self):
+        """Every registered player by canonical name, with or without appearances, sorted."""
+        return self.memo(('roster',), lambda: sorted(self.identities['Name']))
+
+    def name_index(self):
+        return self.memo(('name_index',), lambda: build_name_index(self.identities))
+
+    def with_identities(self, identities):
+        """The same data with a new identity table (which must not add aliases)."""
+        with self._memo_lock:
+            memo = [(key, value) for key, value in self._memo.items() if key[0] not in ('roster', 'name_index')]
+            figures = list(self._figures.items())
+        return Dataset(self.df, self.version, index=self.index, memo=memo, identities=identities, figures=figures)
+
+    def with_match(self, new, version, identities=None):
+        """A new Dataset with `new` (one cleaned match row) inserted at its date position.
+
+        The appearance index is patched rather than rebuilt, and partnership
+        and split tables for filters the match falls outside of are carried over.
+        """
+        new = apply_aliases(new, alias_map(self.identities))
+        df, new = align_categories(self.df, new)
+        new.index = [df.index.max() + 1]
+        new_date = new['Date'].iloc[0]
+        pos = int((df['Date'] >= new_date).sum()) if pd.notna(new_date) else len(df)
+        df = pd.concat([df.iloc[:pos], new, df.iloc[pos:]])
+        df.attrs = dict(self.df.attrs)
+
+        season, comp = new['Tag Season'].iloc[0], new['Competition'].iloc[0]
+        # The warm-up thread may still be filling this Dataset's memo
+        with self._memo_lock:
+            memo = [
+                (key, value) for key, value in self._memo.items()
+                if key[0] in ('partnerships', 'splits') and (key[1] not in (ALL_SEASONS, season) or key[2] not in (ALL_COMPS, comp))
+            ]
+        lineup = new.reindex(columns=SLOT_COLS).iloc[0].tolist()
+        return Dataset(df, version, index=index_add_match(self.index, pos, lineup), memo=memo,
+                       identities=self.identities if identities is None else identities)
+
+
+class MatchStore:
+    """Process-wide access to the match CSV at `path` and its player identity table.
+
+    `data` is the current Dataset. Writers swap it as a whole under a lock, so a
+    caller that read it once keeps a consistent view while a write is applied.
+
+    With `warm_top`, every new Dataset (at startup and after each data change)
+    is warmed in a background thread: the shared tables and the stats of the
+    `warm_top` most-viewed (player, season, competition) selections, topped up
+    with the most-capped players, are built before visitors ask for them.
+    """
+
+    def __init__(self, path, warm_top=0):
+        self.path = path
+        self.identity_path = identity_path(path)
+        self.warm_top = warm_top
+        self._lock = threading.RLock()
+        self._views = Counter()
+        self._views_lock = threading.Lock()
+        self._set(self._load())
+
+    def _load(self):
+        """Dataset for the CSV as it is now; empty if there is no CSV yet.
+
+        Problem rows are reported on `Dataset.errors`; an unreadable file raises.
+        """
+        self._identity_version = storage.read_version(self.identity_path)
+        identities = read_identities(self.identity_path)
+        if not os.path.exists(self.path):
+            return Dataset(pd.DataFrame(), 0, identities=identities)
+        version = storage.read_version(self.path)
+        with METRICS.stage('load_data'):
+            df = snapshot.load_or_build(self.path, lambda: import_matches(self.path)[0])
+            df = apply_aliases(df, alias_map(identities))
+        with METRICS.stage('build:index'):
+            index = build_appearance_index(df)
+        identities, _ = sync_identities(identities, index['players'])
+        return Dataset(df, version, index=index, identities=identities)
+
+    def _set(self, data):
+        self.data = data
+        if self.warm_top and not data.df.empty:
+            threading.Thread(target=self._warm, args=(data,), name="rangers-stats-warm", daemon=True).start()
+
+    def _warm(self, data):
+        warm_up(data, self.most_viewed(data, self.warm_top), lambda: self.data is data)
+
+    def record_view(self, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+        """Count a visit to `player`'s stats under the given filters, for warm-up."""
+        with self._views_lock:
+            self._views[(player, s_sea, s_comp)] += 1
+
+    def most_viewed(self, data, n):
+        """The `n` most-viewed (player, season, competition) selections, topped up with the most-capped players."""
+        with self._views_lock:
+            keys = [key for key, _ in self._views.most_common(n)]
+        apps = np.diff(data.index['indptr'])
+        for pid in np.argsort(-apps, kind='stable'):
+            if len(keys) >= n:
+                break
+            key = (data.index['players'][pid], ALL_SEASONS, ALL_COMPS)
+            if key not in keys:
+                keys.append(key)
+        return keys
+
+    def _stale(self):
+        return (storage.read_version(self.path) != self.data.version
+                or storage.read_version(self.identity_path) != self._identity_version)
+
+    def reload(self):
+        with self._lock:
+            self._set(self._load())
+        return self.data
+
+    def current(self):
+        """The current Dataset, reloaded first if another process has written since.
+
+        If a reload is already running in this process, the last consistent data is
+        served rather than waiting for it.
+        """
+        if self._stale() and self._lock.acquire(blocking=False):
+            try:
+                if self._stale():
+                    self._set(self._load())
+            finally:
+                self._lock.release()
+        return self.data
+
+    def save(self, df):
+        """Replace the whole CSV with `df` (derived columns are dropped)."""
+        df = df.drop(columns=[c for c in DERIVED_COLS if c in df.columns])
+        with self._lock:
+            storage.write_csv(self.path, df)
+            return self.reload()
+
+    def upsert(self, updates):
+        """Apply a batch of fixtures (see `upsert_matches`) in one locked write, then reload once.
+
+        Returns `(dataset, counts)`; raises ValueError, leaving the CSV as it
+        was, when the batch has problems.
+        """
+        counts = {}
+
+        def edit(raw):
+            merged, done = upsert_matches(raw, updates)
+            counts.update(done)
+            return merged
+
+        with self._lock:
+            storage.update_csv(self.path, edit)
+            data = self.reload()
+            known = set(read_identities(self.identity_path)['Name'])
+            if not set(data.identities['Name']) <= known:
+                self._identity_version = write_identities(self.identity_path, data.identities)
+            return data, counts
+
+    def append(self, row):
+        """Append one match (a dict keyed by CSV column) and patch the current data."""
+        with self._lock:
+            data = self.data
+            if data.df.empty or not os.path.exists(self.path):
+                return self.save(pd.DataFrame([row]))
+
+            line, header, version = storage.append_row(self.path, row)
+            if version != data.version + 1:
+                # Another process wrote in between; the patch would miss its rows
+                return self.reload()
+            new = clean_matches(pd.read_csv(io.StringIO(line), names=header))
+            identities, added = sync_identities(data.identities, new.reindex(columns=SLOT_COLS).iloc[0])
+            if added:
+                self._identity_version = write_identities(self.identity_path, identities)
+            self._set(data.with_match(new, version, identities))
+            return self.data
+
+    def register(self, name):
+        """Add `name` to the identity table.
+
+        Returns False if it is blank or already a known spelling once case,
+        accents, punctuation and spacing are ignored ('jack  butland' is Jack Butland).
+        """
+        with self._lock:
+            if not normalize_name(name) or spelling_owner(self.data.name_index(), name) is not None:
+                return False
+            identities, added = sync_identities(self.data.identities, [name])
+            if not added:
+                return False
+            self._identity_version = write_identities(self.identity_path, identities)
+            self.data = self.data.with_identities(identities)
+            return True
+
+    def merge(self, keep, duplicate):
+        """Record `duplicate` as another spelling of `keep` and reload so stats combine."""
+        with self._lock:
+            write_identities(self.identity_path, merge_identities(self.data.identities, keep, duplicate))
+            return self.reload()
@@ -0,0 +1,387 @@
+"""Static JSON (and Parquet) snapshots of the dashboard stats, and a server for them.
+
+`export_stats` writes, under one directory:
+
+* `players/<ID>.json`: one file per player (ID from the identity table) with
+  the numbers the Dashboard and Head-to-Head pages show: summary, streaks and
+  form, season, competition, venue and opponent breakdowns, and the
+  partnership ranking, all over every season and competition;
+* `seasons/<season>.json`: the team's record, streaks and form for the season
+  and every player's totals in it;
+* `players.<fmt>` and `seasons.<fmt>`: the headline tables as single
+  JSON or Parquet files;
+* `manifest.json`: what was written, with the data version and an ETag per file,
+  and `matches.json`: a fingerprint and the lineup of every match.
+
+Each section is computed once for all players from the same tables the
+dashboard reads (cube, splits, partnerships, streaks), not player by player.
+On later runs the match fingerprints are compared with the previous export
+and only players who played in added, removed or changed matches (before or
+after the change) and their seasons are rewritten; files whose content did not
+change keep their ETag.
+
+`make_server` answers GETs for those files from a small threaded HTTP server,
+with ETag / If-None-Match revalidation, so consumers never touch pandas.
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from . import storage
+from .batch import player_stats_table
+from .cube import CUBE_COLS
+from .data import ALL_COMPS, ALL_SEASONS, DERIVED_COLS, RESULT_CODES, SLOT_COLS
+from .form import result_codes, rolling_win_rate, streak_table
+from .splits import ALL_OPPONENTS, ALL_VENUES
+from .stats import streaks
+from .upsert import match_keys
+
+EXPORT_FORMAT = 1
+EXPORT_DIR = 'stats_export'
+TABLE_FORMATS = ('json', 'parquet')
+HAS_PARQUET = any(importlib.util.find_spec(m) is not None for m in ('pyarrow', 'fastparquet'))
+CONTENT_TYPES = {'.json': 'application/json', '.parquet': 'application/vnd.apache.parquet'}
+
+
+def _default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, pd.Timestamp):
+        return value.date().isoformat()
+    if isinstance(value, np.bool_):
+        return bool(value)
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def _dumps(obj):
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def _records(df):
+    """Rows of `df` as dicts: floats to 2 places, dates as 'YYYY-MM-DD', missing values as None."""
+    dates = df.select_dtypes('datetime').columns
+    if len(dates):
+        df = df.assign(**{c: df[c].dt.strftime('%Y-%m-%d') for c in dates})
+    return json.loads(df.to_json(orient='records', double_precision=2))
+
+
+def _grouped_records(df, by):
+    """{value of `by`: records of its rows without `by`}, rows kept in order."""
+    out = {}
+    for key, row in zip(df[by].to_numpy(dtype=object), _records(df.drop(columns=by))):
+        out.setdefault(key, []).append(row)
+    return out
+
+
+def etag(data):
+    return hashlib.sha1(data).hexdigest()[:20]
+
+
+def match_fingerprints(ds):
+    """{match key: {'hash', 'season', 'players'}} for every match of `ds`."""
+    df = ds.df
+    if df.empty:
+        return {}
+    cols = [c for c in df.columns if c not in DERIVED_COLS]
+    hashes = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    slots = df.reindex(columns=SLOT_COLS).astype(object).to_numpy()
+    return {
+        key: {'hash': f"{h:016x}", 'season': None if pd.isna(season) else str(season),
+              'players': sorted({p for p in lineup if isinstance(p, str) and p})}
+        for key, h, season, lineup in zip(match_keys(df).to_numpy(), hashes, df['Tag Season'].to_numpy(dtype=object), slots)
+    }
+
+
+def touched(old, new):
+    """(players, seasons) appearing in matches that differ between two sets of fingerprints."""
+    players, seasons = set(), set()
+    for key in old.keys() | new.keys():
+        a, b = old.get(key), new.get(key)
+        if a is not None and b is not None and a['hash'] == b['hash']:
+            continue
+        for m in (a, b):
+            if m is not None:
+                players.update(m['players'])
+                if m['season'] is not None:
+                    seasons.add(m['season'])
+    return players, seasons
+
+
+def season_slug(season):
+    return re.sub(r'[^0-9A-Za-z]+', '-', str(season)).strip('-') or 'season'
+
+
+def player_documents(ds, players):
+    """{player: document} for `players`, each section computed once for all of them."""
+    headline = player_stats_table(ds, players)
+    cube = ds.cube().reset_index()
+    seasons = cube[(cube['Competition'] == ALL_COMPS) & (cube['Season'] != ALL_SEASONS)]
+    comps = cube[(cube['Season'] == ALL_SEASONS) & (cube['Competition'] != ALL_COMPS)]
+    splits = ds.splits().reset_index()
+    venues = splits[(splits['Opponent'] == ALL_OPPONENTS) & (splits['Venue'] != ALL_VENUES)]
+    opponents = splits[(splits['Venue'] == ALL_VENUES) & (splits['Opponent'] != ALL_OPPONENTS)]
+
+    def breakdown(rows, by, label, sort, ascending):
+        # Same columns and order as season_breakdown / competition_breakdown / opponent and venue splits
+        rows = rows[rows['Player'].isin(players)]
+        out = pd.DataFrame({'Player': rows['Player'].to_numpy(dtype=object), label: rows[by].to_numpy(dtype=object),
+                            'Games': rows['Apps'].to_numpy()})
+        if label in ('Tag Season', 'Competition'):
+            out['Wins'] = rows['W'].to_numpy()
+        else:
+            for col in RESULT_CODES:
+                out[col] = rows[col].to_numpy()
+        out['Win Rate'] = rows['W'].to_numpy() / out['Games'] * 100
+        return _grouped_records(out.sort_values(['Player'] + sort, ascending=[True] + ascending, kind='stable'), 'Player')
+
+    by_season = breakdown(seasons, 'Season', 'Tag Season', ['Tag Season'], [True])
+    by_comp = breakdown(comps, 'Competition', 'Competition', ['Win Rate'], [True])
+    by_venue = breakdown(venues, 'Venue', 'Venue', ['Games', 'Venue'], [False, True])
+    by_opponent = breakdown(opponents, 'Opponent', 'Opponent', ['Games', 'Opponent'], [False, True])
+
+    pairs, index = ds.partnerships(), ds.index
+    src = np.repeat(np.arange(len(pairs['indptr']) - 1), np.diff(pairs['indptr']))
+    partners = pd.DataFrame({'Player': index['players'][src], 'Teammate': index['players'][pairs['partners']],
+                             'Apps': pairs['games'], 'Wins': pairs['wins']})
+    partners = partners[partners['Player'].isin(players)]
+    partners['WinRate'] = partners['Wins'] / partners['Apps'] * 100
+    partners = _grouped_records(partners.sort_values(['Player', 'Teammate'], kind='stable'), 'Player')
+
+    runs = streaks(ds)
+    runs = dict(zip(runs['Player'], _records(runs.drop(columns='Player'))))
+    ids = dict(zip(ds.identities['Name'], ds.identities['ID']))
+    aliases = dict(zip(ds.identities['Name'], ds.identities['Aliases']))
+
+    docs = {}
+    for row in _records(headline):
+        p = row.pop('Player')
+        best = next((r for r in partners.get(p, []) if r['Teammate'] == row['Best Partner']), None)
+        summary = {k: row[k] for k in ('Apps', 'Starts', 'Subs', 'W', 'D', 'L', 'Win Rate')}
+        docs[p] = {
+            'player': p, 'id': ids.get(p), 'aliases': list(aliases.get(p, [])),
+            'summary': {**summary, 'Best Partner': best},
+            'streaks': runs.get(p),
+            'by_season': by_season.get(p, []),
+            'by_competition': by_comp.get(p, []),
+            'by_venue': by_venue.get(p, []),
+            'by_opponent': by_opponent.get(p, []),
+            'partners': partners.get(p, []),
+        }
+    return docs
+
+
+def season_records(df):
+    """The team's Games, W/D/L and Win Rate per Season, in season order."""
+    if df.empty:
+        return pd.DataFrame(columns=['Season', 'Games', *RESULT_CODES, 'Win Rate'])
+    codes, seasons = pd.factorize(df['Tag Season'], sort=True)
+    ok = codes >= 0
+    res = pd.Categorical(df['ResultCode'], categories=RESULT_CODES).codes[ok]
+    table = pd.DataFrame({'Season': np.asarray(seasons, dtype=object).astype(str),
+                          'Games': np.bincount(codes[ok], minlength=len(seasons))})
+    for i, col in enumerate(RESULT_CODES):
+        table[col] = np.bincount(codes[ok], weights=res == i, minlength=len(seasons)).astype(np.int64)
+    table['Win Rate'] = table['W'] / table['Games'] * 100
+    return table
+
+
+def season_documents(ds, seasons):
+    """{season: document} for `seasons`: team record, streaks and form, and every player's totals.
+
+    Team streaks treat each season as an owner of its own matches, so all
+    seasons come from one pass, and the player totals are cube rows.
+    """
+    table = season_records(ds.df)
+    records = dict(zip(table['Season'], _records(table.drop(columns='Season'))))
+
+    df, codes = ds.df, result_codes(ds.df)
+    sea_codes, names = pd.factorize(df['Tag Season'].astype(object), sort=True)
+    rows = np.arange(len(df))[::-1]  # oldest first
+    rows = rows[np.argsort(sea_codes[rows], kind='stable')]
+    rows = rows[sea_codes[rows] >= 0]
+    owner = sea_codes[rows]
+    names = np.asarray(names, dtype=object).astype(str)
+    runs = streak_table(owner, rows, names, df['Date'].to_numpy(), codes)
+    form = np.full(len(names), np.nan)
+    if len(rows):
+        last = np.append(owner[1:] != owner[:-1], True)
+        form[owner[last]] = rolling_win_rate(owner, rows, codes)[last]
+    runs['Form'] = form
+    runs = dict(zip(runs['Player'], _records(runs.drop(columns='Player'))))
+
+    cube = ds.cube().reset_index()
+    cube = cube[(cube['Competition'] == ALL_COMPS) & (cube['Season'] != ALL_SEASONS) & (cube['Apps'] > 0)]
+    players = cube[['Season', 'Player', *CUBE_COLS]].astype({'Season': str})
+    players['Win Rate'] = players['W'] / players['Apps'] * 100
+    players = _grouped_records(players.sort_values(['Season', 'Apps', 'Player'], ascending=[True, False, True]), 'Season')
+    return {season: {'season': season, 'record': records[season], 'streaks': runs.get(season),
+                     'players': players.get(season, [])} for season in seasons}
+
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write(path, data):
+    """Write `data` (bytes) atomically unless the file already holds it. Returns its ETag."""
+    tag = etag(data)
+    try:
+        with open(path, 'rb') as f:
+            if etag(f.read()) == tag:
+                return tag
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    storage.replace_file(path, lambda f: f.write(data), binary=True)
+    return tag
+
+
+def _write_table(path, table, fmt):
+    if fmt == 'json':
+        return _write(path, _dumps(_records(table)).encode('utf-8'))
+    # Rendered in memory so it goes through the same atomic, skip-if-unchanged write
+    buf = io.BytesIO()
+    table.to_parquet(buf, index=False)
+    return _write(path, buf.getvalue())
+
+
+def export_stats(ds, out_dir=EXPORT_DIR, fmt='json', full=False):
+    """Write (or bring up to date) the export of `ds` in `out_dir`. Returns the manifest.
+
+    Without `full`, only players and seasons touched since the export already in
+    `out_dir` are recomputed; a missing or older-format export is rebuilt.
+    """
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Unknown format: {fmt}")
+    if fmt == 'parquet' and not HAS_PARQUET:
+        raise ValueError("Parquet export needs pyarrow or fastparquet installed.")
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    old = _read_json(manifest_path, {})
+    old_matches = _read_json(os.path.join(out_dir, 'matches.json'), {})
+    matches = match_fingerprints(ds)
+    rebuild = full or old.get('format') != EXPORT_FORMAT or old.get('table_format') != fmt
+
+    all_players = [p for p, n in zip(ds.index['players'], np.diff(ds.index['indptr'])) if n]
+    all_seasons = [str(s) for s in pd.unique(ds.df['Tag Season'].dropna())] if not ds.df.empty else []
+    if rebuild:
+        players, seasons = set(all_players), set(all_seasons)
+    else:
+        players, seasons = touched(old_matches, matches)
+        # Players whose file is missing, e.g. renamed by an identity merge
+        players |= set(all_players) - set(old.get('players', {}))
+
+    player_files = {} if rebuild else dict(old.get('players', {}))
+    docs = player_documents(ds, [p for p in all_players if p in players])
+    ids = dict(zip(ds.identities['Name'], ds.identities['ID']))
+    for p, doc in docs.items():
+        rel = f"players/{ids[p]}.json"
+        player_files[p] = {'id': int(ids[p]), 'path': rel, 'etag': _write(os.path.join(out_dir, rel), _dumps(doc).encode('utf-8'))}
+    season_files = {} if rebuild else dict(old.get('seasons', {}))
+    for season, doc in season_documents(ds, [s for s in all_seasons if s in seasons]).items():
+        rel = f"seasons/{season_slug(season)}.json"
+        season_files[season] = {'path': rel, 'etag': _write(os.path.join(out_dir, rel), _dumps(doc).encode('utf-8'))}
+
+    # Drop files of players and seasons no longer in the data
+    for files, keep in ((player_files, set(all_players)), (season_files, set(all_seasons))):
+        for name in [n for n in files if n not in keep]:
+            path = os.path.join(out_dir, files.pop(name)['path'])
+            if os.path.exists(path):
+                os.remove(path)
+
+    tables = {}
+    if rebuild or players or seasons:
+        headline = player_stats_table(ds)
+        tables['players'] = headline[headline['Apps'] > 0]
+        tables['seasons'] = season_records(ds.df)
+    table_files = dict(old.get('tables', {})) if not rebuild else {}
+    for name, table in tables.items():
+        rel = f"{name}.{fmt}"
+        table_files[name] = {'path': rel, 'etag': _write_table(os.path.join(out_dir, rel), table, fmt)}
+
+    os.makedirs(out_dir, exist_ok=True)
+    _write(os.path.join(out_dir, 'matches.json'), _dumps(matches).encode('utf-8'))
+    manifest = {
+        'format': EXPORT_FORMAT, 'table_format': fmt, 'data_version': ds.version,
+        'generated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'updated': {'players': len(docs), 'seasons': len(seasons & set(all_seasons))},
+        'players': dict(sorted(player_files.items())), 'seasons': dict(sorted(season_files.items())),
+        'tables': table_files,
+    }
+    _write(manifest_path, _dumps(manifest).encode('utf-8'))
+    return manifest
+
+
+class _ExportHandler(BaseHTTPRequestHandler):
+    root = None
+    _etags = {}
+    _etags_lock = threading.Lock()
+
+    def _etag(self, path):
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self._etags_lock:
+            tag = self._etags.get(key)
+        if tag is None:
+            with open(path, 'rb') as f:
+                tag = etag(f.read())
+            with self._etags_lock:
+                self._etags[key] = tag
+        return tag
+
+    def _resolve(self):
+        rel = self.path.split('?', 1)[0].lstrip('/') or 'manifest.json'
+        path = os.path.realpath(os.path.join(self.root, rel))
+        if not path.startswith(self.root + os.sep) or os.path.splitext(path)[1] not in CONTENT_TYPES \
+                or not os.path.isfile(path):
+            return None
+        return path
+
+    def do_HEAD(self):
+        self.do_GET(body=False)
+
+    def do_GET(self, body=True):
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+        tag = f'"{self._etag(path)}"'
+        if tag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', tag)
+            self.end_headers()
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPES[os.path.splitext(path)[1]])
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', tag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(out_dir=EXPORT_DIR, host='127.0.0.1', port=8765):
+    """A ThreadingHTTPServer serving the export in `out_dir` (call `serve_forever()`).
+
+    GET / returns the manifest; other paths are the files it lists.
+    """
+    handler = type('ExportHandler', (_ExportHandler,), {'root': os.path.realpath(out_dir), '_etags': {}})
+    return ThreadingHTTPServer((host, port), handler)
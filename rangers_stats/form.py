@@ -0,0 +1,129 @@
+"""Streaks and rolling form for every player at once.
+
+All functions work on "sequences": every appearance of every player, grouped
+by player and in date order within each player, as flat arrays. Runs are
+found with one run-length encoding over the whole array (a run starts
+wherever the player or the flag changes), and rolling windows with one
+cumulative sum, so the cost is linear in appearances regardless of how many
+players there are. The team is the same computation over every match, with a
+single owner.
+"""
+import numpy as np
+import pandas as pd
+
+from .data import RESULT_CODES
+
+FORM_WINDOW = 10
+STREAK_COLUMNS = ['Longest Unbeaten', 'Unbeaten From', 'Unbeaten To', 'Current Unbeaten',
+                  'Longest Winning', 'Winning From', 'Winning To', 'Current Winning']
+
+
+def player_sequences(index, row_mask):
+    """(owner, rows): each player's masked appearances, oldest first, players in ID order.
+
+    Index rows are positions in the newest-first frame, so a player's slice
+    reversed is their chronological order.
+    """
+    owner = np.repeat(np.arange(len(index['players'])), np.diff(index['indptr']))
+    order = np.lexsort((-index['rows'], owner))
+    owner, rows = owner[order], index['rows'][order]
+    keep = row_mask[rows]
+    return owner[keep], rows[keep]
+
+
+def team_sequence(row_mask):
+    """(owner, rows) for the team: every masked match, oldest first, all owned by 0."""
+    rows = np.flatnonzero(row_mask)[::-1]
+    return np.zeros(len(rows), dtype=np.int64), rows
+
+
+def result_codes(df):
+    """Per-row index into RESULT_CODES (W/D/L), -1 when unknown."""
+    return pd.Categorical(df['ResultCode'], categories=RESULT_CODES).codes
+
+
+def longest_runs(owner, flag, n_owners):
+    """Per owner: (longest run of True, its first and last positions, trailing run).
+
+    Positions index the sequence arrays and are -1 for owners without any run;
+    ties go to the earliest run.
+    """
+    n = len(flag)
+    longest = np.zeros(n_owners, dtype=np.int64)
+    first = np.full(n_owners, -1, dtype=np.int64)
+    last = np.full(n_owners, -1, dtype=np.int64)
+    current = np.zeros(n_owners, dtype=np.int64)
+    if not n:
+        return longest, first, last, current
+    new_run = np.ones(n, dtype=bool)
+    new_run[1:] = (owner[1:] != owner[:-1]) | (flag[1:] != flag[:-1])
+    start = np.flatnonzero(new_run)
+    length = np.diff(np.append(start, n))
+    run_owner, run_flag = owner[start], flag[start]
+
+    runs = np.flatnonzero(run_flag)
+    order = np.lexsort((start[runs], -length[runs], run_owner[runs]))
+    runs = runs[order]
+    best = runs[np.append(True, run_owner[runs][1:] != run_owner[runs][:-1])] if len(runs) else runs
+    longest[run_owner[best]] = length[best]
+    first[run_owner[best]] = start[best]
+    last[run_owner[best]] = start[best] + length[best] - 1
+
+    # An owner's final run is current if it is a True run
+    final = np.append(run_owner[1:] != run_owner[:-1], True)
+    final_true = final & run_flag
+    current[run_owner[final_true]] = length[final_true]
+    return longest, first, last, current
+
+
+def _dates_at(dates, rows, pos):
+    """Dates of sequence positions `pos`, NaT where `pos` is -1 (also when there are no rows at all)."""
+    out = pd.Series(pd.NaT, index=range(len(pos)), dtype=dates.dtype)
+    has = pos >= 0
+    out[has] = dates[rows[pos[has]]]
+    return out
+
+
+def streak_table(owner, rows, names, dates, codes):
+    """Longest and current unbeaten and winning runs per owner, with the dates the longest ran between."""
+    res = codes[rows]
+    table = pd.DataFrame({'Player': names})
+    for label, flag in (('Unbeaten', (res >= 0) & (res != RESULT_CODES.index('L'))),
+                        ('Winning', res == RESULT_CODES.index('W'))):
+        longest, first, last, current = longest_runs(owner, flag, len(names))
+        table[f'Longest {label}'] = longest
+        table[f'{label} From'] = _dates_at(dates, rows, first)
+        table[f'{label} To'] = _dates_at(dates, rows, last)
+        table[f'Current {label}'] = current
+    return table[['Player'] + STREAK_COLUMNS]
+
+
+def rolling_win_rate(owner, rows, codes, window=FORM_WINDOW):
+    """Win rate (percent) over each appearance and up to `window - 1` before it by the same owner."""
+    won = (codes[rows] == RESULT_CODES.index('W')).astype(np.int64)
+    cum = np.concatenate([[0], np.cumsum(won)])
+    pos = np.arange(len(rows))
+    new_owner = np.ones(len(rows), dtype=bool)
+    new_owner[1:] = owner[1:] != owner[:-1]
+    owner_start = np.maximum.accumulate(np.where(new_owner, pos, 0))
+    lo = np.maximum(pos + 1 - window, owner_start)
+    return (cum[pos + 1] - cum[lo]) / (pos + 1 - lo) * 100
+
+
+def calendar_form(owner, rows, names, dates, codes, freq='Y'):
+    """Games, W/D/L and Win Rate per owner per calendar period ('Y' years, 'M' months, 'Q' quarters)."""
+    period = pd.PeriodIndex(dates[rows], freq=freq)
+    p_codes, periods = pd.factorize(period, sort=True)
+    ok = p_codes >= 0
+    keys = owner[ok] * max(len(periods), 1) + p_codes[ok]
+    uniq, inv = np.unique(keys, return_inverse=True)
+    res = codes[rows][ok]
+    out = pd.DataFrame({
+        'Player': names[uniq // max(len(periods), 1)],
+        'Period': periods[uniq % max(len(periods), 1)].astype(str) if len(periods) else [],
+        'Games': np.bincount(inv, minlength=len(uniq)),
+    })
+    for code, col in enumerate(RESULT_CODES):
+        out[col] = np.bincount(inv, weights=res == code, minlength=len(uniq)).astype(np.int64)
+    out['Win Rate'] = out['W'] / out['Games'] * 100
+    return out
@@ -0,0 +1,139 @@
+"""Chunked import of match CSVs with bounded memory and row-level errors.
+
+The file is parsed `chunksize` rows at a time. Each chunk is cleaned and its
+repetitive columns are encoded straight away against dictionaries that grow
+across chunks, so only integer codes (and the few per-row text columns) are
+kept while the rest of the file is read. Problems are collected as RowErrors
+rather than failing the whole load: malformed lines are skipped, other
+problem rows are kept and reported.
+"""
+import re
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from . import storage
+from .data import RESULT_CODES, STARTER_COLS, category_groups, clean_matches
+
+CHUNK_ROWS = 50_000
+
+RowError = namedtuple('RowError', 'line column message')
+
+_BAD_LINE = re.compile(r"Skipping line (\d+): (.*)")
+
+
+def _bad_lines(caught):
+    """RowErrors for the lines the C parser skipped, from its ParserWarnings."""
+    errors = []
+    for w in caught:
+        for m in _BAD_LINE.finditer(str(w.message)):
+            errors.append(RowError(int(m.group(1)), None, m.group(2).strip()))
+    return errors
+
+
+def _file_lines(ordinals, skipped):
+    """CSV line numbers of parsed records `ordinals` (0-based), given the skipped line numbers."""
+    lines = []
+    for k in ordinals:
+        line = int(k) + 2  # after the header, one line per record
+        for bad in skipped:
+            if bad <= line:
+                line += 1
+        lines.append(line)
+    return lines
+
+
+def check_matches(chunk):
+    """(positional row, column, message) for each problem in a cleaned chunk."""
+    problems = []
+    for pos in np.flatnonzero(chunk['Date'].isna().to_numpy()):
+        problems.append((pos, 'Day/Month/Year', f"unparseable date '{chunk['DateStr'].iloc[pos]}'"))
+    for pos in np.flatnonzero(~chunk['ResultCode'].isin(RESULT_CODES).to_numpy()):
+        problems.append((pos, 'Win/Lose/Draw', f"unknown result '{chunk['Win/Lose/Draw'].iloc[pos]}'"))
+    for col in ('Tag Season', 'Competition'):
+        for pos in np.flatnonzero(chunk[col].isna().to_numpy()):
+            problems.append((pos, col, "missing"))
+    starters = [c for c in STARTER_COLS if c in chunk.columns]
+    for pos in np.flatnonzero(chunk[starters].isna().all(axis=1).to_numpy()):
+        problems.append((pos, 'R1-R11', "no starting lineup"))
+    return problems
+
+
+class _Encoder:
+    """Codes for one category group, against a dictionary that grows as chunks arrive."""
+
+    def __init__(self):
+        self.values = pd.Index([], dtype=object)
+
+    def encode(self, frame):
+        cells = frame.to_numpy(dtype=object)
+        present = pd.notna(cells) & (cells != '')
+        new = pd.unique(cells[present])
+        new = new[self.values.get_indexer(new) < 0]
+        if len(new):
+            self.values = self.values.append(pd.Index(new, dtype=object))
+        codes = np.where(present, self.values.get_indexer(cells.ravel()).reshape(cells.shape), -1)
+        return codes.astype(np.int32)
+
+    def dtype_and_remap(self):
+        """The final sorted CategoricalDtype, and the map from growth-order codes to it."""
+        order = np.argsort(np.asarray(self.values, dtype=object), kind='stable')
+        remap = np.empty(len(order) + 1, dtype=np.int32)
+        remap[order] = np.arange(len(order))
+        remap[-1] = -1  # code -1 (missing) indexes the last slot
+        return pd.CategoricalDtype(self.values[order]), remap
+
+
+def import_matches(path, chunksize=CHUNK_ROWS, progress=None):
+    """Parse, clean and compact the CSV at `path` chunk by chunk, newest match first.
+
+    Returns `(df, errors)`: the same frame `read_matches` builds and a list of
+    RowErrors, which are also kept in `df.attrs['import_errors']`.
+    `progress(bytes_read, total_bytes, rows)` is called after each chunk.
+    """
+    encoders, groups, columns = {}, None, None
+    parts, codes, errors, skipped = [], [], [], []
+    rows = 0
+    with storage.open_complete(path) as f:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', pd.errors.ParserWarning)
+            warnings.simplefilter('ignore', pd.errors.DtypeWarning)
+            reader = pd.read_csv(f, chunksize=chunksize, on_bad_lines='warn')
+            for chunk in reader:
+                bad = _bad_lines(caught)
+                caught.clear()
+                errors.extend(bad)
+                skipped = sorted(skipped + [e.line for e in bad])
+
+                chunk.index = pd.RangeIndex(rows, rows + len(chunk))
+                chunk = clean_matches(chunk)
+                problems = check_matches(chunk)
+                for (pos, column, message), line in zip(problems, _file_lines([rows + p for p, _, _ in problems], skipped)):
+                    errors.append(RowError(line, column, message))
+
+                if groups is None:
+                    columns = list(chunk.columns)
+                    groups = category_groups(columns)
+                    encoders = {tuple(g): _Encoder() for g in groups}
+                codes.append({tuple(g): encoders[tuple(g)].encode(chunk[g]) for g in groups})
+                parts.append(chunk.drop(columns=[c for g in groups for c in g]))
+                rows += len(chunk)
+                if progress is not None:
+                    progress(f.raw.bytes_read, f.raw.size, rows)
+            errors.extend(_bad_lines(caught))
+
+    if not parts:
+        return pd.DataFrame(), errors
+    df = pd.concat(parts)
+    for group in groups:
+        dtype, remap = encoders[tuple(group)].dtype_and_remap()
+        group_codes = remap[np.concatenate([c[tuple(group)] for c in codes])]
+        for i, col in enumerate(group):
+            df[col] = pd.Categorical.from_codes(group_codes[:, i], dtype=dtype)
+    df['ResultCode'] = df['ResultCode'].astype(pd.CategoricalDtype(RESULT_CODES))
+    errors.sort(key=lambda e: e.line)
+    df = df[columns].sort_values('Date', ascending=False)
+    df.attrs['import_errors'] = [list(e) for e in errors]
+    return df, errors
@@ -0,0 +1,103 @@
+"""Player x match appearance index.
+
+The index is a plain dict of arrays in CSR form: player `pid`'s appearances
+are `rows[indptr[pid]:indptr[pid + 1]]`, positional rows of the match frame in
+ascending order, with a parallel `starter` flag.
+"""
+import numpy as np
+import pandas as pd
+
+from .data import SLOT_COLS, STARTER_COLS
+
+
+def build_appearance_index(df):
+    """Build the index from the lineup slots of `df`.
+
+    Player IDs are positions in `players`, sorted at build time; players first
+    seen by `index_add_match` are appended.
+    """
+    slots = df.reindex(columns=SLOT_COLS)
+    dtype = slots[SLOT_COLS[0]].dtype
+    if isinstance(dtype, pd.CategoricalDtype) and all(slots[c].dtype == dtype for c in SLOT_COLS):
+        # Shared player dictionary: its codes already are the player IDs
+        codes = np.column_stack([slots[c].cat.codes.to_numpy() for c in SLOT_COLS]).ravel()
+        pos = np.flatnonzero(codes >= 0)
+        codes, players = codes[pos].astype(np.int64), dtype.categories
+    else:
+        cells = slots.to_numpy(dtype=object).ravel()
+        pos = np.flatnonzero(pd.notna(cells) & (cells != ''))
+        codes, players = pd.factorize(cells[pos], sort=True)
+    rows, slots = np.divmod(pos, len(SLOT_COLS))
+    # Sort by player, then row, then slot so the first hit per (player, row) is the lowest slot
+    order = np.lexsort((slots, rows, codes))
+    codes, rows, slots = codes[order], rows[order], slots[order]
+    first = np.ones(len(codes), dtype=bool)
+    first[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+    codes, rows, slots = codes[first], rows[first], slots[first]
+    indptr = np.zeros(len(players) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(players)), out=indptr[1:])
+    players = np.asarray(players, dtype=object)
+    return {
+        'players': players,
+        'player_id': {p: i for i, p in enumerate(players)},
+        'indptr': indptr,
+        'rows': rows,
+        'starter': slots < len(STARTER_COLS),
+    }
+
+
+def index_add_match(index, pos, lineup):
+    """Copy of `index` with one match inserted at positional row `pos`.
+
+    `lineup` holds the 22 slot values in R1..R22 order. Existing rows at or after
+    `pos` shift down by one and unseen players get new IDs at the end.
+    """
+    players, player_id = index['players'], dict(index['player_id'])
+    new_players, seen = [], {}
+    for slot, name in enumerate(lineup):
+        if pd.isna(name) or name == '':
+            continue
+        if name not in player_id:
+            player_id[name] = len(players) + len(new_players)
+            new_players.append(name)
+        seen.setdefault(player_id[name], slot < len(STARTER_COLS))
+    if new_players:
+        players = np.concatenate([players, np.array(new_players, dtype=object)])
+
+    indptr = np.concatenate([index['indptr'], np.full(len(new_players), index['indptr'][-1])])
+    rows = index['rows'].copy()
+    rows[rows >= pos] += 1
+    pids = np.array(sorted(seen), dtype=np.int64)
+    at = [indptr[p] + np.searchsorted(rows[indptr[p]:indptr[p + 1]], pos) for p in pids]
+    rows = np.insert(rows, at, pos)
+    starter = np.insert(index['starter'], at, [seen[p] for p in pids])
+    added = np.zeros(len(players), dtype=np.int64)
+    added[pids] = 1
+    indptr[1:] += np.cumsum(added)
+    return {'players': players, 'player_id': player_id, 'indptr': indptr, 'rows': rows, 'starter': starter}
+
+
+def starting_lineups(index, n_rows):
+    """`n_rows` x 11 matrix of the starter IDs of each row (-1 padded), each player once per lineup."""
+    pids = np.repeat(np.arange(len(index['players'])), np.diff(index['indptr']))[index['starter']]
+    rows = index['rows'][index['starter']]
+    order = np.argsort(rows, kind='stable')
+    rows, pids = rows[order], pids[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    lineups = np.full((n_rows, len(STARTER_COLS)), -1, dtype=np.int64)
+    lineups[rows, rank] = pids
+    return lineups
+
+
+def player_rows(index, player, row_mask=None):
+    """Positional rows and starter flags for `player`, optionally limited to `row_mask`."""
+    pid = index['player_id'].get(player)
+    if pid is None:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+    sl = slice(index['indptr'][pid], index['indptr'][pid + 1])
+    rows, starter = index['rows'][sl], index['starter'][sl]
+    if row_mask is not None:
+        keep = row_mask[rows]
+        rows, starter = rows[keep], starter[keep]
+    return rows, starter
+
@@ -0,0 +1,157 @@
+"""Lineup combinations: which groups of starters played, and won, together most.
+
+Two kinds of query:
+
+* Combinations of any `size` players among the starting XI (trios, fours...),
+  found by Eclat-style frequent-itemset mining. Each frequent player is a
+  bitset over matches (bit r set when they started row r); a combination's
+  games are the popcount of the AND of its members' bitsets, and the search
+  only extends combinations that still meet the minimum games.
+* Fixed units from given slots, such as the back four (R2-R5) or the whole
+  XI (R1-R11): every lineup's unit is a sorted row of player codes and equal
+  rows are counted with np.unique.
+"""
+import numpy as np
+import pandas as pd
+
+from .data import SLOT_COLS, STARTER_COLS
+
+MIN_LINEUP_GAMES = 10
+# Lineups list the goalkeeper first, then the defence
+LINEUP_UNITS = {
+    'Back Four': SLOT_COLS[1:5],
+    'Starting XI': STARTER_COLS,
+}
+COMBO_COLUMNS = ['Players', 'Games', 'Wins', 'Win Rate']
+PAIR_BLOCK = 64
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(bits):
+        return np.bitwise_count(bits).sum(axis=-1, dtype=np.int64)
+else:
+    _BYTE_BITS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(bits):
+        return _BYTE_BITS[bits.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def lineup_codes(df, cols):
+    """Player codes for `cols` of `df` (rows x len(cols), -1 when empty) and the names they index."""
+    slots = df.reindex(columns=cols)
+    dtype = slots[cols[0]].dtype
+    if isinstance(dtype, pd.CategoricalDtype) and all(slots[c].dtype == dtype for c in cols):
+        codes = np.column_stack([slots[c].cat.codes.to_numpy() for c in cols]).astype(np.int64)
+        return codes, np.asarray(dtype.categories, dtype=object)
+    cells = slots.to_numpy(dtype=object)
+    present = pd.notna(cells) & (cells != '')
+    codes, names = pd.factorize(cells[present], sort=True)
+    out = np.full(cells.shape, -1, dtype=np.int64)
+    out[present] = codes
+    return out, np.asarray(names, dtype=object)
+
+
+def _table(combos, games, wins, names):
+    """Result frame for `combos` (rows of player codes into `names`), members listed alphabetically."""
+    combos = np.asarray(combos, dtype=np.int64)
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[np.argsort(names.astype(str), kind='stable')] = np.arange(len(names))
+    combos = np.take_along_axis(combos, np.argsort(rank[combos], axis=1), axis=1)
+    cols = [pd.Series(names[combos[:, k]], dtype=object) for k in range(combos.shape[1])]
+    labels = cols[0].str.cat(cols[1:], sep=", ")
+    table = pd.DataFrame({'Players': labels.to_numpy(), 'Games': np.asarray(games, dtype=np.int64),
+                          'Wins': np.asarray(wins, dtype=np.int64)}, columns=COMBO_COLUMNS[:3])
+    table['Win Rate'] = table['Wins'] / table['Games'] * 100 if len(table) else pd.Series(dtype=float)
+    return table.sort_values(['Games', 'Wins'], ascending=False, ignore_index=True)
+
+
+def frequent_combinations(df, row_mask, won, size, min_games=MIN_LINEUP_GAMES):
+    """Every set of `size` starters who started at least `min_games` of the masked matches together.
+
+    Returns a DataFrame of Players ("A, B, C"), Games, Wins and Win Rate,
+    most games first.
+    """
+    codes, names = lineup_codes(df, STARTER_COLS)
+    rows = np.flatnonzero(row_mask)
+    codes = codes[rows]
+    r, c = np.nonzero(codes >= 0)
+    pids, rows = codes[r, c], r
+    # One bit per (player, match), even if a name is listed twice in a lineup
+    pairs = np.unique(pids * len(codes) + rows)
+    pids, rows = np.divmod(pairs, max(len(codes), 1))
+
+    starts = np.bincount(pids, minlength=len(names))
+    frequent = np.flatnonzero(starts >= max(min_games, 1))
+    if size < 1 or len(frequent) < size:
+        return _table(np.empty((0, max(size, 1))), [], [], names)
+    slot = np.full(len(names), -1, dtype=np.int64)
+    slot[frequent] = np.arange(len(frequent))
+    keep = slot[pids] >= 0
+
+    n_words = (len(codes) + 63) // 64
+    bits = np.zeros((len(frequent), n_words), dtype=np.uint64)
+    np.bitwise_or.at(bits, (slot[pids[keep]], rows[keep] // 64),
+                     np.left_shift(np.uint64(1), (rows[keep] % 64).astype(np.uint64)))
+    won_bits = np.zeros(n_words, dtype=np.uint64)
+    won_rows = np.flatnonzero(won[row_mask])
+    np.bitwise_or.at(won_bits, won_rows // 64, np.left_shift(np.uint64(1), (won_rows % 64).astype(np.uint64)))
+
+    combos, games, wins = [], [], []
+
+    def extend(prefix, prefix_bits, words, candidates):
+        # Candidates are later (higher slot) items, so each set is reached once.
+        # Only the words where the prefix has any matches can contribute.
+        nz = prefix_bits != 0
+        words, prefix_bits = words[nz], prefix_bits[nz]
+        inter = bits[candidates[:, None], words] & prefix_bits
+        counts = _popcount(inter)
+        ok = counts >= min_games
+        candidates, inter, counts = candidates[ok], inter[ok], counts[ok]
+        if len(prefix) + 1 == size:
+            combos.append(np.column_stack([np.tile(prefix, (len(candidates), 1)), frequent[candidates]]))
+            games.append(counts)
+            wins.append(_popcount(inter & won_bits[words]))
+            return
+        if len(prefix) + 2 == size:
+            # Last level for all candidate pairs at once, a block of rows at a time
+            for start in range(0, len(candidates), PAIR_BLOCK):
+                block = inter[start:start + PAIR_BLOCK]
+                both = block[:, None, :] & inter[None, :, :]
+                counts = _popcount(both)
+                a, b = np.nonzero(counts >= min_games)
+                a_abs = a + start
+                later = b > a_abs
+                a, b, a_abs = a[later], b[later], a_abs[later]
+                combos.append(np.column_stack([np.tile(prefix, (len(a), 1)), frequent[candidates[a_abs]], frequent[candidates[b]]]))
+                games.append(counts[a, b])
+                wins.append(_popcount(both[a, b] & won_bits[words]))
+            return
+        for i in range(len(candidates) - size + len(prefix) + 1):
+            extend(prefix + (frequent[candidates[i]],), inter[i], words, candidates[i + 1:])
+
+    if size == 1:
+        return _table(frequent[:, None], starts[frequent], _popcount(bits & won_bits), names)
+    for i in range(len(frequent) - size + 1):
+        extend((frequent[i],), bits[i], np.arange(n_words), np.arange(i + 1, len(frequent)))
+    if not combos:
+        return _table(np.empty((0, size)), [], [], names)
+    return _table(np.concatenate(combos), np.concatenate(games), np.concatenate(wins), names)
+
+
+def unit_combinations(df, row_mask, won, cols, min_games=1):
+    """How often each exact set of players in `cols` lined up together, e.g. a back four.
+
+    Lineups with an empty or repeated slot in `cols` are skipped. Same columns
+    as `frequent_combinations`.
+    """
+    codes, names = lineup_codes(df, cols)
+    codes, won = np.sort(codes[row_mask], axis=1), won[row_mask]
+    full = (codes[:, 0] >= 0) & (np.diff(codes, axis=1) != 0).all(axis=1)
+    codes, won = codes[full], won[full]
+    if not len(codes):
+        return _table(np.empty((0, len(cols))), [], [], names)
+    units, inv = np.unique(codes, axis=0, return_inverse=True)
+    inv = inv.ravel()
+    games = np.bincount(inv, minlength=len(units))
+    wins = np.bincount(inv, weights=won, minlength=len(units)).astype(np.int64)
+    ok = games >= min_games
+    return _table(units[ok], games[ok], wins[ok], names)
@@ -0,0 +1,108 @@
+"""Stage timings and cache hit/miss counters.
+
+`METRICS` is shared by the whole process: every session, the warm-up thread
+and the Dataset memo record into it. Each timed stage keeps its last
+`STAGE_WINDOW` durations for percentiles, and is also emitted as one JSON
+line on the `rangers_stats.metrics` logger (at DEBUG) and, when the
+RANGERS_STATS_METRICS environment variable names a file, appended to it, so
+latency can be followed under real load outside the app.
+
+A thread can also collect the stages it times into a list (`begin_run`),
+which is how the app shows the timings of the rerun that just ran.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+STAGE_WINDOW = 1000
+METRICS_FILE_ENV = 'RANGERS_STATS_METRICS'
+STAGE_COLUMNS = ['Stage', 'Calls', 'Mean ms', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms']
+CACHE_COLUMNS = ['Table', 'Hits', 'Misses', 'Waits', 'Hit Rate']
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """Thread-safe stage timings (a window of recent durations each) and cache counters."""
+
+    def __init__(self, path=None, window=STAGE_WINDOW):
+        self.path = path
+        self.window = window
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._times = defaultdict(lambda: deque(maxlen=self.window))
+            self._calls = Counter()
+            self._cache = Counter()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time the body as stage `name`; `fields` are added to its log line."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0, **fields)
+
+    def record(self, name, seconds, **fields):
+        with self._lock:
+            self._times[name].append(seconds)
+            self._calls[name] += 1
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run.append((name, seconds * 1000))
+        self._emit({'ts': time.time(), 'stage': name, 'ms': round(seconds * 1000, 3), **fields})
+
+    def cache(self, table, outcome):
+        """Count a memo lookup of `table` ('hit', 'miss', or 'wait' for another session's build)."""
+        with self._lock:
+            self._cache[(table, outcome)] += 1
+
+    def begin_run(self):
+        """Start collecting the stages timed on this thread; returns the (stage, ms) list."""
+        self._local.run = []
+        return self._local.run
+
+    def _emit(self, event):
+        line = json.dumps(event, default=str)
+        logger.debug(line)
+        if self.path:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def stage_summary(self):
+        """Calls and latency percentiles (over the recent window) per stage, slowest p95 first."""
+        with self._lock:
+            times = {name: np.array(d) * 1000 for name, d in self._times.items() if d}
+            calls = dict(self._calls)
+        rows = [[name, calls[name], t.mean(), *np.percentile(t, [50, 95, 99]), t.max()] for name, t in times.items()]
+        table = pd.DataFrame(rows, columns=STAGE_COLUMNS)
+        return table.sort_values('p95 ms', ascending=False, ignore_index=True)
+
+    def cache_summary(self):
+        """Hits, misses and waits per memoized table, most lookups first."""
+        with self._lock:
+            counts = dict(self._cache)
+        tables = sorted({table for table, _ in counts})
+        table = pd.DataFrame({
+            'Table': tables,
+            'Hits': [counts.get((t, 'hit'), 0) for t in tables],
+            'Misses': [counts.get((t, 'miss'), 0) for t in tables],
+            'Waits': [counts.get((t, 'wait'), 0) for t in tables],
+        }, columns=CACHE_COLUMNS[:4])
+        lookups = table['Hits'] + table['Misses'] + table['Waits']
+        table['Hit Rate'] = table['Hits'] / lookups.clip(lower=1) * 100
+        return table.iloc[np.argsort(-lookups.to_numpy(), kind='stable')].reset_index(drop=True)
+
+
+METRICS = Metrics(os.environ.get(METRICS_FILE_ENV) or None)
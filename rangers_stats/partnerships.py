@@ -0,0 +1,72 @@
+"""Starter partnerships: games and wins together for every pair of players."""
+import numpy as np
+import pandas as pd
+
+from .data import STARTER_COLS
+from .index import starting_lineups
+
+MIN_PARTNER_GAMES = 5
+
+
+def build_partnerships(index, row_mask, won):
+    """Games and wins together for every pair of starters, in CSR form.
+
+    This is the co-appearance product S'S (and S'diag(won)S) of the starter
+    incidence matrix, accumulated from the C(11, 2) slot pairs of each lineup.
+    Partners of `pid` are `partners[indptr[pid]:indptr[pid + 1]]`, sorted by ID.
+    """
+    n_players = len(index['players'])
+    lineups, won = starting_lineups(index, len(row_mask))[row_mask], won[row_mask]
+
+    i, j = np.triu_indices(len(STARTER_COLS), k=1)
+    a, b = lineups[:, i].ravel(), lineups[:, j].ravel()
+    w = np.repeat(won, len(i))
+    ok = (a >= 0) & (b >= 0)
+    a, b, w = a[ok], b[ok], w[ok]
+    keys = np.concatenate([a * n_players + b, b * n_players + a])
+    uniq, inv = np.unique(keys, return_inverse=True)
+    games = np.bincount(inv, minlength=len(uniq))
+    wins = np.bincount(inv, weights=np.concatenate([w, w]), minlength=len(uniq)).astype(np.int64)
+    src, partners = np.divmod(uniq, n_players)
+    indptr = np.zeros(n_players + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_players), out=indptr[1:])
+    return {'indptr': indptr, 'partners': partners, 'games': games, 'wins': wins}
+
+
+def partner_table(pairs, index, player):
+    """Partnership ranking for `player`: one row per teammate started alongside."""
+    pid = index['player_id'].get(player)
+    if pid is None or pid + 1 >= len(pairs['indptr']):
+        return pd.DataFrame(columns=['Teammate', 'Apps', 'Wins', 'WinRate'])
+    sl = slice(pairs['indptr'][pid], pairs['indptr'][pid + 1])
+    tm_stats = pd.DataFrame({
+        'Teammate': index['players'][pairs['partners'][sl]],
+        'Apps': pairs['games'][sl],
+        'Wins': pairs['wins'][sl],
+    })
+    tm_stats['WinRate'] = tm_stats['Wins'] / tm_stats['Apps'] * 100
+    return tm_stats.sort_values('Teammate', ignore_index=True)
+
+
+def pair_stats(pairs, index, pA, pB):
+    """(games, wins) started together by `pA` and `pB`."""
+    a, b = index['player_id'].get(pA), index['player_id'].get(pB)
+    if a is None or b is None or max(a, b) + 1 >= len(pairs['indptr']):
+        return 0, 0
+    lo, hi = pairs['indptr'][a], pairs['indptr'][a + 1]
+    k = lo + np.searchsorted(pairs['partners'][lo:hi], b)
+    if k < hi and pairs['partners'][k] == b:
+        return int(pairs['games'][k]), int(pairs['wins'][k])
+    return 0, 0
+
+
+def best_partner(tm_stats, min_games=MIN_PARTNER_GAMES):
+    """Highest win rate (then most games) among partners with `min_games`+ starts together.
+
+    Falls back to all partners when none reach `min_games`; None without partners.
+    """
+    if tm_stats.empty:
+        return None
+    meaningful = tm_stats[tm_stats['Apps'] >= min_games]
+    if meaningful.empty: meaningful = tm_stats
+    return meaningful.sort_values(['WinRate', 'Apps'], ascending=[False, False]).iloc[0]
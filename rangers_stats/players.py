@@ -0,0 +1,171 @@
+"""Player identities: canonical IDs, alias spellings and fuzzy name search.
+
+The identity table is a CSV next to the match data (`<stem>_players.csv`) with
+one row per person: `ID`, canonical `Name` and `Aliases`, a '|'-separated list
+of other spellings found in lineups ("J Ryburn" for "John Ryburn"). Lineups
+keep whatever spelling was entered; aliases are mapped to the canonical name
+when the data is loaded, so all stats are per person.
+
+Search uses a trigram index over every spelling: a query's trigrams are
+looked up in posting arrays and names are scored by overlap, so lookups cost
+the same whether the roster has hundreds or many thousands of names.
+"""
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from . import storage
+from .data import SLOT_COLS
+
+IDENTITY_COLS = ['ID', 'Name', 'Aliases']
+ALIAS_SEP = '|'
+SEARCH_LIMIT = 25
+SEARCH_SCORE = 0.3
+DUPLICATE_SCORE = 0.5
+
+
+def identity_path(csv_path):
+    return f"{os.path.splitext(csv_path)[0]}_players.csv"
+
+
+def empty_identities():
+    return pd.DataFrame({'ID': pd.Series(dtype=np.int64), 'Name': pd.Series(dtype=object),
+                         'Aliases': pd.Series(dtype=object)})
+
+
+def read_identities(path):
+    """The identity table at `path` (empty if there is none), Aliases as lists."""
+    if not os.path.exists(path):
+        return empty_identities()
+    table = storage.read_csv(path).reindex(columns=IDENTITY_COLS)
+    table['ID'] = table['ID'].astype(np.int64)
+    table['Name'] = table['Name'].astype(object)
+    table['Aliases'] = [[a for a in str(s).split(ALIAS_SEP) if a] if pd.notna(s) else [] for s in table['Aliases']]
+    return table
+
+
+def write_identities(path, table):
+    out = table.assign(Aliases=[ALIAS_SEP.join(a) for a in table['Aliases']])
+    return storage.write_csv(path, out.sort_values('ID'))
+
+
+def alias_map(table):
+    """{alias spelling: canonical name}."""
+    return {alias: name for name, aliases in zip(table['Name'], table['Aliases']) for alias in aliases}
+
+
+def sync_identities(table, names):
+    """`table` plus a new identity for each of `names` it does not know. Returns (table, added names)."""
+    known = set(table['Name']) | set(alias_map(table))
+    new = sorted({n for n in names if isinstance(n, str) and n and n not in known})
+    if not new:
+        return table, []
+    start = int(table['ID'].max()) + 1 if len(table) else 1
+    added = pd.DataFrame({'ID': np.arange(start, start + len(new), dtype=np.int64), 'Name': new,
+                          'Aliases': [[] for _ in new]})
+    return pd.concat([table, added], ignore_index=True), new
+
+
+def merge_identities(table, keep, duplicate):
+    """`table` with `duplicate` (and its aliases) folded into `keep` as aliases."""
+    if keep == duplicate:
+        raise ValueError("Cannot merge a player into themselves.")
+    names = list(table['Name'])
+    if keep not in names or duplicate not in names:
+        raise KeyError(f"Unknown player: {keep if keep not in names else duplicate}")
+    table = table.copy()
+    k, d = names.index(keep), names.index(duplicate)
+    table.at[table.index[k], 'Aliases'] = table['Aliases'].iloc[k] + [duplicate] + table['Aliases'].iloc[d]
+    return table.drop(index=table.index[d]).reset_index(drop=True)
+
+
+def apply_aliases(df, aliases):
+    """`df` with alias spellings in the lineup slots replaced by canonical names."""
+    slots = [c for c in SLOT_COLS if c in df.columns]
+    if not aliases or not slots:
+        return df
+    dtype = df[slots[0]].dtype
+    if not (isinstance(dtype, pd.CategoricalDtype) and all(df[c].dtype == dtype for c in slots)):
+        df = df.copy()
+        df[slots] = df[slots].replace(aliases)
+        return df
+    cats = dtype.categories
+    if not cats.isin(list(aliases)).any():
+        return df
+    canonical = pd.Index([aliases.get(c, c) for c in cats])
+    merged = pd.CategoricalDtype(sorted(set(canonical)))
+    remap = np.append(merged.categories.get_indexer(canonical), -1)
+    df = df.copy()
+    for c in slots:
+        df[c] = pd.Categorical.from_codes(remap[df[c].cat.codes.to_numpy()], dtype=merged)
+    return df
+
+
+def normalize_name(name):
+    """Lowercase ASCII letters and digits, single-spaced: 'Ally  McCoist' and 'ally mccoist' match."""
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_name_index(table):
+    """Trigram postings over every canonical name and alias in `table`."""
+    spellings, owners = [], []
+    for name, aliases in zip(table['Name'], table['Aliases']):
+        for spelling in [name] + list(aliases):
+            spellings.append(normalize_name(spelling))
+            owners.append(name)
+    postings = {}
+    sizes = np.zeros(len(spellings), dtype=np.int64)
+    for i, spelling in enumerate(spellings):
+        grams = trigrams(spelling)
+        sizes[i] = len(grams)
+        for g in grams:
+            postings.setdefault(g, []).append(i)
+    return {
+        'spellings': np.array(spellings, dtype=object),
+        'owners': np.array(owners, dtype=object),
+        'sizes': sizes,
+        'postings': {g: np.array(ids, dtype=np.int64) for g, ids in postings.items()},
+    }
+
+
+def search_names(index, query, limit=SEARCH_LIMIT, min_score=0.0):
+    """Canonical names best matching `query`, as (name, score) pairs, best first.
+
+    The score is the Dice coefficient of the trigram sets, nudged up for
+    spellings that contain the query outright so that partial typing ranks
+    sensibly. Each person appears once, under their best-scoring spelling.
+    """
+    q = normalize_name(query)
+    if not q or not len(index['spellings']):
+        return []
+    grams = trigrams(q)
+    hits = [index['postings'][g] for g in grams if g in index['postings']]
+    if not hits:
+        return []
+    overlap = np.bincount(np.concatenate(hits), minlength=len(index['spellings']))
+    cand = np.flatnonzero(overlap)
+    score = 2 * overlap[cand] / (len(grams) + index['sizes'][cand])
+    contains = np.array([q in s for s in index['spellings'][cand]])
+    score = np.where(contains, (1 + score) / 2 + 0.25, score)
+    best = {}
+    for i in np.argsort(-score, kind='stable'):
+        if score[i] < min_score or len(best) >= limit:
+            break
+        best.setdefault(index['owners'][cand[i]], float(min(score[i], 1.0)))
+    return list(best.items())
+
+
+def spelling_owner(index, name):
+    """Canonical name of the identity with a spelling equal to `name` once normalized, else None."""
+    key = normalize_name(name)
+    owners = index['owners'][index['spellings'] == key] if key else []
+    return owners[0] if len(owners) else None
@@ -0,0 +1,150 @@
+"""Columnar, memory-mapped snapshot of the cleaned match frame.
+
+The CSV stays the source of truth. A snapshot directory next to it holds one
+`.npy` file per column and is rebuilt whenever the CSV changes. Categorical
+columns are stored as codes into a category list kept once in the manifest
+(the lineup slots share one), in the integer width pandas itself uses for
+that many categories, so on load the categoricals wrap the mapped files
+without copying them; numeric and date columns are mapped as they are. Only
+the per-row text columns (Title, Score, DateStr) are decoded into memory.
+The frame's `attrs` (such as import errors) ride along in the manifest.
+"""
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 4
+MANIFEST = "manifest.json"
+INDEX_COL = "__index__"
+
+
+def snapshot_dir(csv_path):
+    return f"{csv_path}.snapshot"
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_manifest(snap_dir):
+    try:
+        with open(os.path.join(snap_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == FORMAT_VERSION else None
+
+
+def _write_manifest(snap_dir, manifest):
+    tmp = os.path.join(snap_dir, f".{MANIFEST}.{uuid.uuid4().hex}")
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(snap_dir, MANIFEST))
+
+
+def write_snapshot(df, snap_dir, source):
+    """Write `df` as a snapshot of `source` (a dict with the CSV signature and sha256)."""
+    os.makedirs(snap_dir, exist_ok=True)
+    gen = uuid.uuid4().hex[:8]
+    columns, dictionaries = [], {}
+    frame = df.reset_index(names=INDEX_COL)
+    for i, name in enumerate(frame.columns):
+        col = frame[name]
+        entry = {'name': name, 'file': f"{gen}-{i}.npy"}
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            arr = col.array.codes
+            entry['kind'] = 'category'
+            entry['dictionary'] = dictionaries.setdefault(col.dtype, len(dictionaries))
+        elif pd.api.types.is_numeric_dtype(col.dtype) or pd.api.types.is_datetime64_dtype(col.dtype):
+            arr = col.to_numpy()
+            entry['kind'] = 'array'
+        else:
+            codes, cats = pd.factorize(col)
+            arr = codes.astype(np.int32)
+            entry['kind'] = 'strings'
+            entry['categories'] = [str(c) for c in cats]
+        np.save(os.path.join(snap_dir, entry['file']), arr, allow_pickle=False)
+        columns.append(entry)
+    _write_manifest(snap_dir, {
+        'format': FORMAT_VERSION, 'source': source, 'rows': len(frame), 'columns': columns,
+        'dictionaries': [[str(c) for c in dtype.categories] for dtype in dictionaries],
+        'attrs': df.attrs,
+    })
+
+    # Old generations stay readable to anyone who still has them mapped
+    keep = {c['file'] for c in columns} | {MANIFEST}
+    for fname in os.listdir(snap_dir):
+        if fname.endswith('.npy') and fname not in keep:
+            try:
+                os.remove(os.path.join(snap_dir, fname))
+            except OSError:
+                pass
+
+
+def read_snapshot(snap_dir, manifest=None):
+    manifest = manifest or _read_manifest(snap_dir)
+    if manifest is None:
+        return None
+    dtypes = [pd.CategoricalDtype(cats) for cats in manifest['dictionaries']]
+    data = {}
+    for entry in manifest['columns']:
+        arr = np.load(os.path.join(snap_dir, entry['file']), mmap_mode='r', allow_pickle=False)
+        if entry['kind'] == 'category':
+            # Written in the width pandas expects, so the codes stay mapped; validated on write
+            arr = pd.Categorical.from_codes(arr, dtype=dtypes[entry['dictionary']], validate=False)
+        elif entry['kind'] == 'strings':
+            # Trailing None slot so missing values (code -1) decode to None
+            cats = np.array(entry['categories'] + [None], dtype=object)
+            arr = cats[arr]
+        data[entry['name']] = arr
+    df = pd.DataFrame(data, copy=False).set_index(INDEX_COL).rename_axis(None)
+    df.attrs.update(manifest.get('attrs', {}))
+    return df
+
+
+def load_or_build(csv_path, build):
+    """Return the cleaned frame for `csv_path`, from its snapshot when it is current.
+
+    `build` parses the CSV from scratch. The snapshot is reused while the CSV's
+    mtime and size are unchanged, or when only the mtime moved but the content
+    hash still matches; otherwise it is rebuilt from `build()`.
+    """
+    snap_dir = snapshot_dir(csv_path)
+    sig = file_signature(csv_path)
+    manifest = _read_manifest(snap_dir)
+    if manifest is not None:
+        src = manifest['source']
+        fresh = src['mtime_ns'] == sig['mtime_ns'] and src['size'] == sig['size']
+        if not fresh and src['size'] == sig['size'] and src['sha256'] == file_hash(csv_path):
+            manifest['source'] = {**src, **sig}
+            try:
+                _write_manifest(snap_dir, manifest)
+            except OSError:
+                pass
+            fresh = True
+        if fresh:
+            try:
+                return read_snapshot(snap_dir, manifest)
+            except (OSError, ValueError, KeyError):
+                pass
+
+    source = {**sig, 'sha256': file_hash(csv_path)}
+    df = build()
+    try:
+        write_snapshot(df, snap_dir, source)
+    except OSError:
+        pass  # Read-only deployments just skip the snapshot
+    return df
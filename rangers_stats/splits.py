@@ -0,0 +1,84 @@
+"""Opponent and venue splits: appearance totals per player x opponent x venue.
+
+Built once per Season/Competition filter from the appearance index, like the
+partnership tables, so "record vs Celtic" or "away win rate" is a lookup
+rather than another scan of the match frame. Partnership splits come from the
+two players' slices of the index (the rows both started), so they cost the
+pair's appearances only.
+"""
+import numpy as np
+import pandas as pd
+
+from .cube import CUBE_COLS, rollup_counts
+from .data import RESULT_CODES
+
+ALL_OPPONENTS = 'All Opponents'
+ALL_VENUES = 'All Venues'
+VENUE_COL = 'Home/Away/Neutral'
+SPLIT_COLS = ['Games', 'W', 'D', 'L', 'Win Rate']
+
+
+def _grouped(owner, owners, opp, opps, venue, venues, res, starter):
+    """Totals per (owner, opponent, venue) with ALL_OPPONENTS / ALL_VENUES rollups, laid out like the cube."""
+    return rollup_counts(owner, owners, (opp, opps, ALL_OPPONENTS), (venue, venues, ALL_VENUES), res, starter,
+                         ['Player', 'Opponent', 'Venue'])
+
+
+def _dimensions(df):
+    opp_codes, opps = pd.factorize(df['Opponent'])
+    venue_codes, venues = pd.factorize(df[VENUE_COL])
+    res = pd.Categorical(df['ResultCode'], categories=RESULT_CODES).codes
+    return opp_codes, opps, venue_codes, venues, res
+
+
+def build_splits(df, index, row_mask):
+    """Totals per (Player, Opponent, Venue) over the masked rows, with rollups."""
+    owner = np.repeat(np.arange(len(index['players'])), np.diff(index['indptr']))
+    rows, starter = index['rows'], index['starter']
+    keep = row_mask[rows]
+    owner, rows, starter = owner[keep], rows[keep], starter[keep]
+    opp, opps, venue, venues, res = _dimensions(df)
+    return _grouped(owner, index['players'], opp[rows], opps, venue[rows], venues, res[rows], starter)
+
+
+def pair_splits(df, index, row_mask, pA, pB):
+    """Totals per (pair, Opponent, Venue) over the masked rows both `pA` and `pB` started."""
+    sides = []
+    for p in (pA, pB):
+        pid = index['player_id'].get(p)
+        sl = slice(index['indptr'][pid], index['indptr'][pid + 1]) if pid is not None else slice(0, 0)
+        sides.append(index['rows'][sl][index['starter'][sl]])
+    rows = np.intersect1d(*sides, assume_unique=True)
+    rows = rows[row_mask[rows]]
+    opp, opps, venue, venues, res = _dimensions(df)
+    return _grouped(np.zeros(len(rows), dtype=np.int64), [f"{pA} & {pB}"], opp[rows], opps,
+                    venue[rows], venues, res[rows], np.ones(len(rows), dtype=bool))
+
+
+def split_table(splits, owner, by, opponent=ALL_OPPONENTS, venue=ALL_VENUES):
+    """Games, W/D/L and Win Rate of `owner` per 'Opponent' or per 'Venue', most games first.
+
+    The other dimension is held at `opponent` / `venue`.
+    """
+    try:
+        p = splits.xs(owner, level='Player')
+    except KeyError:
+        p = splits.iloc[:0].droplevel('Player')
+    opps, venues = p.index.get_level_values('Opponent'), p.index.get_level_values('Venue')
+    if by == 'Opponent':
+        labels, sel = opps, (venues == venue) & (opps != ALL_OPPONENTS)
+    else:
+        labels, sel = venues, (opps == opponent) & (venues != ALL_VENUES)
+    out = pd.DataFrame({by: np.asarray(labels[sel], dtype=object), 'Games': p['Apps'].to_numpy()[sel]})
+    for col in RESULT_CODES:
+        out[col] = p[col].to_numpy()[sel]
+    out['Win Rate'] = out['W'] / out['Games'] * 100
+    return out[[by] + SPLIT_COLS].sort_values(['Games', by], ascending=[False, True], ignore_index=True)
+
+
+def split_totals(splits, owner, opponent=ALL_OPPONENTS, venue=ALL_VENUES):
+    """Apps/Starts/Subs/W/D/L of `owner` against `opponent` at `venue`."""
+    try:
+        return splits.loc[(owner, opponent, venue)].to_dict()
+    except KeyError:
+        return dict.fromkeys(CUBE_COLS, 0)
@@ -0,0 +1,235 @@
+"""Player, partnership and head-to-head stats over a Dataset.
+
+Every function takes the Dataset plus the sidebar filters and is pure with
+respect to them; results worth keeping are memoized on the Dataset.
+"""
+import logging
+
+import numpy as np
+
+from .cube import player_breakdown, player_totals
+from .data import ALL_COMPS, ALL_SEASONS, SLOT_COLS
+from .form import (FORM_WINDOW, calendar_form, player_sequences, result_codes, rolling_win_rate, streak_table,
+                   team_sequence)
+from .index import player_rows
+from .lineups import LINEUP_UNITS, MIN_LINEUP_GAMES, frequent_combinations, unit_combinations
+from .partnerships import best_partner, pair_stats, partner_table
+from .players import DUPLICATE_SCORE, SEARCH_LIMIT, SEARCH_SCORE, search_names
+from .splits import ALL_OPPONENTS, ALL_VENUES, pair_splits, split_table, split_totals
+
+logger = logging.getLogger(__name__)
+
+
+def player_matches(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """The player's matches under the filters, newest first, with a Starter/Sub 'Role' column."""
+    rows, starter = player_rows(ds.index, player, ds.mask(s_sea, s_comp))
+    p_df = ds.df.iloc[rows].copy()
+    p_df['Role'] = np.where(starter, 'Starter', 'Sub')
+    return p_df
+
+
+def partnership_table(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Teammate, Apps, Wins and WinRate for every player started alongside `player`."""
+    return ds.memo(('partner_table', player, s_sea, s_comp),
+                   lambda: partner_table(ds.partnerships(s_sea, s_comp), ds.index, player))
+
+
+def player_summary(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Headline numbers for the dashboard.
+
+    Apps/Starts/Subs/W/D/L, 'Win Rate' (percent of apps won) and 'Best Partner'
+    (a row of `partnership_table`, or None).
+    """
+    def build():
+        summary = player_totals(ds.cube(), player, s_sea, s_comp)
+        summary['Win Rate'] = (summary['W'] / summary['Apps'] * 100) if summary['Apps'] else 0
+        summary['Best Partner'] = best_partner(partnership_table(ds, player, s_sea, s_comp))
+        return summary
+    return ds.memo(('summary', player, s_sea, s_comp), build)
+
+
+def season_breakdown(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Games, Wins and Win Rate per 'Tag Season', in season order."""
+    return ds.memo(('by_season', player, s_sea, s_comp), lambda: (
+        player_breakdown(ds.cube(), player, 'Season', s_sea, s_comp)
+        .rename(columns={'Season': 'Tag Season'}).sort_values('Tag Season')
+    ))
+
+
+def competition_breakdown(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Games, Wins and Win Rate per 'Competition', lowest win rate first."""
+    return ds.memo(('by_comp', player, s_sea, s_comp), lambda: (
+        player_breakdown(ds.cube(), player, 'Competition', s_sea, s_comp).sort_values('Win Rate', ascending=True)
+    ))
+
+
+def h2h_stats(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    def build():
+        t = player_totals(ds.cube(), player, s_sea, s_comp)
+        return {'Total': t['Apps'], 'Wins': t['W'], 'Starts': t['Starts'], 'Win Rate': (t['W']/t['Apps']*100) if t['Apps'] else 0}
+    return ds.memo(('h2h', player, s_sea, s_comp), build)
+
+
+def partnership_chem(ds, pA, pB, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """(games started together, win rate as a duo)."""
+    total, wins = pair_stats(ds.partnerships(s_sea, s_comp), ds.index, pA, pB)
+    return total, (wins/total*100) if total > 0 else 0
+
+
+def teammates(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Everyone who shared a matchday squad with `player` under the filters."""
+    rows, _ = player_rows(ds.index, player, ds.mask(s_sea, s_comp))
+    names = ds.df.iloc[rows][SLOT_COLS].to_numpy(dtype=object).ravel()
+    return sorted({p for p in names if isinstance(p, str) and p and p != player})
+
+
+def opponent_splits(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS, venue=ALL_VENUES):
+    """Games, W/D/L and Win Rate of `player` per Opponent (at `venue`), most games first."""
+    return ds.memo(('by_opponent', player, venue, s_sea, s_comp),
+                   lambda: split_table(ds.splits(s_sea, s_comp), player, 'Opponent', venue=venue))
+
+
+def venue_splits(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS, opponent=ALL_OPPONENTS):
+    """Games, W/D/L and Win Rate of `player` per Home/Away/Neutral (against `opponent`)."""
+    return ds.memo(('by_venue', player, opponent, s_sea, s_comp),
+                   lambda: split_table(ds.splits(s_sea, s_comp), player, 'Venue', opponent=opponent))
+
+
+def record_against(ds, player, opponent=ALL_OPPONENTS, venue=ALL_VENUES, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Apps/Starts/Subs/W/D/L and 'Win Rate' of `player` against `opponent` at `venue`."""
+    t = split_totals(ds.splits(s_sea, s_comp), player, opponent, venue)
+    t['Win Rate'] = (t['W'] / t['Apps'] * 100) if t['Apps'] else 0
+    return t
+
+
+def partnership_splits(ds, pA, pB, by='Opponent', s_sea=ALL_SEASONS, s_comp=ALL_COMPS,
+                       opponent=ALL_OPPONENTS, venue=ALL_VENUES):
+    """Games, W/D/L and Win Rate of `pA` and `pB` starting together, per 'Opponent' or per 'Venue'."""
+    pA, pB = sorted((pA, pB))
+    splits = ds.memo(('pair_splits', pA, pB, s_sea, s_comp),
+                     lambda: pair_splits(ds.df, ds.index, ds.mask(s_sea, s_comp), pA, pB))
+    return split_table(splits, f"{pA} & {pB}", by, opponent, venue)
+
+
+def lineup_combinations(ds, size, min_games=MIN_LINEUP_GAMES, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Every group of `size` starters with at least `min_games` starts together: Players, Games, Wins, Win Rate."""
+    return ds.memo(('combos', size, min_games, s_sea, s_comp),
+                   lambda: frequent_combinations(ds.df, ds.mask(s_sea, s_comp), ds.won(), size, min_games))
+
+
+def lineup_units(ds, unit, min_games=1, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Exact line-ups of a LINEUP_UNITS unit ('Back Four', 'Starting XI'), same columns as `lineup_combinations`."""
+    return ds.memo(('units', unit, min_games, s_sea, s_comp),
+                   lambda: unit_combinations(ds.df, ds.mask(s_sea, s_comp), ds.won(), LINEUP_UNITS[unit], min_games))
+
+
+def _sequences(ds, s_sea, s_comp, team=False):
+    """(owner, rows) for every player, or for the team, under the filters, oldest first."""
+    mask = ds.mask(s_sea, s_comp)
+    return ds.memo(('sequences', team, s_sea, s_comp),
+                   lambda: team_sequence(mask) if team else player_sequences(ds.index, mask))
+
+
+def _codes(ds):
+    return ds.memo(('result_codes',), lambda: result_codes(ds.df))
+
+
+def _owners(ds, team):
+    return np.array(['Rangers'], dtype=object) if team else ds.index['players']
+
+
+def _form(ds, window, s_sea, s_comp, team=False):
+    owner, rows = _sequences(ds, s_sea, s_comp, team)
+    return ds.memo(('form', team, window, s_sea, s_comp),
+                   lambda: rolling_win_rate(owner, rows, _codes(ds), window))
+
+
+def streaks(ds, s_sea=ALL_SEASONS, s_comp=ALL_COMPS, window=FORM_WINDOW, team=False):
+    """Longest and current unbeaten/winning runs and last-`window` 'Form' (win rate) for every player.
+
+    With `team` the single row is the team's own record over every match.
+    Players without an appearance under the filters have zero runs and NaN form.
+    """
+    def build():
+        owner, rows = _sequences(ds, s_sea, s_comp, team)
+        codes = _codes(ds)
+        table = streak_table(owner, rows, _owners(ds, team), ds.df['Date'].to_numpy(), codes)
+        form = np.full(len(table), np.nan)
+        if len(rows):
+            last = np.append(owner[1:] != owner[:-1], True)
+            form[owner[last]] = _form(ds, window, s_sea, s_comp, team)[last]
+        table['Form'] = form
+        return table
+    return ds.memo(('streaks', team, window, s_sea, s_comp), build)
+
+
+def player_streaks(ds, player, s_sea=ALL_SEASONS, s_comp=ALL_COMPS, window=FORM_WINDOW):
+    """`player`'s row of `streaks` as a dict, or None if they have no appearances."""
+    pid = ds.index['player_id'].get(player)
+    return None if pid is None else streaks(ds, s_sea, s_comp, window).iloc[pid].to_dict()
+
+
+def rolling_form(ds, player=None, window=FORM_WINDOW, s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Date, Opponent, Result and 'Form' (win rate over the last `window` games) per appearance, oldest first.
+
+    The team's matches when `player` is None.
+    """
+    team = player is None
+    owner, rows = _sequences(ds, s_sea, s_comp, team)
+    form = _form(ds, window, s_sea, s_comp, team)
+    if not team:
+        pid = ds.index['player_id'].get(player, -1)
+        lo, hi = np.searchsorted(owner, [pid, pid + 1])
+        rows, form = rows[lo:hi], form[lo:hi]
+    out = ds.df.iloc[rows][['Date', 'Opponent', 'ResultCode']].rename(columns={'ResultCode': 'Result'})
+    out['Form'] = form
+    return out.reset_index(drop=True)
+
+
+def form_by_period(ds, player=None, freq='Y', s_sea=ALL_SEASONS, s_comp=ALL_COMPS):
+    """Games, W/D/L and Win Rate per calendar period ('Y', 'Q' or 'M') for `player`, or the team when None."""
+    team = player is None
+
+    def build():
+        owner, rows = _sequences(ds, s_sea, s_comp, team)
+        codes = _codes(ds)
+        return calendar_form(owner, rows, _owners(ds, team), ds.df['Date'].to_numpy(), codes, freq)
+    table = ds.memo(('calendar_form', team, freq, s_sea, s_comp), build)
+    if not team:
+        table = table[table['Player'] == player]
+    return table.drop(columns='Player').reset_index(drop=True)
+
+
+def search_players(ds, query, limit=SEARCH_LIMIT):
+    """Registered players best matching `query`; the most-capped players when it is blank."""
+    if not str(query).strip():
+        apps = np.diff(ds.index['indptr'])
+        return [ds.index['players'][i] for i in np.argsort(-apps, kind='stable')[:limit]]
+    return [name for name, _ in search_names(ds.name_index(), query, limit, SEARCH_SCORE)]
+
+
+def similar_players(ds, name, min_score=DUPLICATE_SCORE):
+    """(registered player, score) pairs that `name` may be a duplicate of, closest first."""
+    return search_names(ds.name_index(), name, min_score=min_score)
+
+
+def warm_up(ds, selections, keep_going=lambda: True):
+    """Build the shared tables and the dashboard stats for each (player, season, comp) in `selections`.
+
+    Stops between selections once `keep_going()` is false, e.g. when newer
+    data has replaced `ds`. A selection that fails is logged and skipped, so
+    it cannot stop the ones after it from being warmed.
+    """
+    ds.cube()
+    ds.partnerships()
+    for player, s_sea, s_comp in selections:
+        if not keep_going():
+            return
+        try:
+            player_summary(ds, player, s_sea, s_comp)
+            season_breakdown(ds, player, s_sea, s_comp)
+            competition_breakdown(ds, player, s_sea, s_comp)
+            h2h_stats(ds, player, s_sea, s_comp)
+            streaks(ds, s_sea, s_comp)
+        except Exception:
+            logger.exception("Warm-up failed for %r (%s, %s)", player, s_sea, s_comp)
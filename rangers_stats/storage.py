@@ -0,0 +1,190 @@
+"""Locked, atomic access to the match CSV.
+
+Every write takes an exclusive lock on `<csv>.lock`, replaces or appends to the
+CSV and bumps the data version in `<csv>.version`. Full rewrites go through a
+temp file and `os.replace`, so a reader never opens a half-written file. Reads
+take no lock: they drop any trailing partial line from an append in flight and
+so always see the last complete state.
+"""
+import csv
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def lock_path(path):
+    return f"{path}.lock"
+
+
+def version_path(path):
+    return f"{path}.version"
+
+
+@contextmanager
+def locked(path):
+    """Hold the write lock for `path` across processes (and threads, via separate opens)."""
+    with open(lock_path(path), 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_version(path):
+    try:
+        with open(version_path(path)) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _file_mode(path):
+    """Permissions for a new `path`: those of the file it replaces, else the umask default."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def replace_file(path, write, binary=False):
+    """Write a new `path` through `write(file)` into a temp file, then rename it in.
+
+    Readers see the old file or the new one, never a partial write. `write`
+    gets a text file (newlines untranslated), or a binary one with `binary`.
+    The temp file is created private (0600); it takes `path`'s mode before the
+    rename so other tools can still read the file.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=f".{os.path.basename(path)}.")
+    try:
+        os.chmod(tmp, _file_mode(path))
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', newline='')) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _bump_version(path):
+    version = read_version(path) + 1
+    replace_file(version_path(path), lambda f: f.write(str(version)))
+    return version
+
+
+def read_csv(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    # An append in flight may have landed only part of its line
+    return pd.read_csv(io.BytesIO(raw[:raw.rfind(b'\n') + 1]))
+
+
+class _Prefix(io.RawIOBase):
+    """The first `size` bytes of the binary file `f`."""
+
+    def __init__(self, f, size):
+        self._f, self._left, self.size = f, size, size
+
+    def readable(self):
+        return True
+
+    @property
+    def bytes_read(self):
+        return self.size - self._left
+
+    def readinto(self, b):
+        n = self._f.readinto(memoryview(b)[:self._left])
+        self._left -= n
+        return n
+
+
+def _complete_size(f):
+    """Bytes up to and including the last newline of the binary file `f`."""
+    end = f.seek(0, os.SEEK_END)
+    pos = end
+    while pos > 0:
+        step = min(pos, 1 << 16)
+        pos -= step
+        f.seek(pos)
+        nl = f.read(step).rfind(b'\n')
+        if nl >= 0:
+            f.seek(0)
+            return pos + nl + 1
+    f.seek(0)
+    return 0
+
+
+@contextmanager
+def open_complete(path):
+    """Stream the CSV without a lock, like `read_csv`, up to its last complete line.
+
+    Yields a binary file; its `raw.bytes_read` and `raw.size` track progress.
+    """
+    with open(path, 'rb') as f:
+        with io.BufferedReader(_Prefix(f, _complete_size(f))) as stream:
+            yield stream
+
+
+def write_csv(path, df):
+    """Replace the whole CSV with `df`. Returns the new data version."""
+    with locked(path):
+        replace_file(path, lambda f: df.to_csv(f, index=False, lineterminator='\n'))
+        return _bump_version(path)
+
+
+def update_csv(path, edit):
+    """Read-modify-write under one lock: `edit(df)` returns the frame to store, or None to abort.
+
+    Returns the new data version, or None when `edit` aborted.
+    """
+    with locked(path):
+        df = edit(pd.read_csv(path))
+        if df is None:
+            return None
+        replace_file(path, lambda f: df.to_csv(f, index=False, lineterminator='\n'))
+        return _bump_version(path)
+
+
+def append_row(path, row):
+    """Append one record (a dict keyed by column) to the CSV.
+
+    Returns `(line, header, version)`: the CSV text written, the file's column
+    order and the new data version.
+    """
+    with locked(path):
+        with open(path, newline='') as f:
+            header = next(csv.reader(f))
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator='\n').writerow([row.get(c) for c in header])
+        line = buf.getvalue()
+        with open(path, 'rb+') as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            f.write(line.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        return line, header, _bump_version(path)
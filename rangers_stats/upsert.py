@@ -0,0 +1,114 @@
+"""Match keys and bulk upserts of many fixtures in one write.
+
+A match is identified by its date and opponent: 'YYYY-MM-DD Opponent', with
+' #2', ' #3'... for further matches against the same opponent on the same day,
+numbered in file order. Keys are derived rather than stored, so the CSV keeps
+its columns; a grid or file of changes that carries the original 'Match Key'
+can therefore change a fixture's date or opponent too. Editing a fixture's
+date or opponent changes its key, so a batch still carrying the old key is
+rejected rather than inserted as a duplicate.
+
+`upsert_matches` applies a whole batch to the raw CSV frame at once: rows whose
+key is already in the file replace the cells they fill in, rows without a
+key are added. A missing (NaN) cell leaves the stored value alone, so a partly blank
+upload only changes what it gives; an empty string clears the field. The
+batch is checked first and rejected as a whole if any row has a problem, so
+a bad upload never leaves half its rows applied.
+"""
+import numpy as np
+import pandas as pd
+
+from .data import DERIVED_COLS, clean_matches, date_strings
+from .importer import RowError, check_matches
+
+KEY_COL = 'Match Key'
+
+
+def match_keys(df):
+    """Key of every row of `df` (raw or cleaned), in `df`'s order.
+
+    Repeats of a date and opponent are numbered by index order, which is file
+    order for the frames the store loads.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    date_str = date_strings(df)
+    date = pd.to_datetime(date_str, errors='coerce')
+    base = date.dt.strftime('%Y-%m-%d').fillna(date_str) + " " + df['Opponent'].astype(str).str.strip()
+    base = base.astype(object)
+    in_file_order = base.sort_index(kind='stable')
+    n = in_file_order.groupby(in_file_order, sort=False).cumcount().reindex(base.index)
+    return base.where(n == 0, base + " #" + (n + 1).astype(str))
+
+
+def _whole_date_parts(df):
+    """`df` with whole-number Day and Year stored as integers, so a float column is not written back as '5.0'."""
+    for c in ('Day', 'Year'):
+        num = pd.to_numeric(df[c], errors='coerce')
+        whole = (num % 1 == 0).to_numpy()
+        if whole.any() and df[c].dtype != np.int64:
+            df[c] = df[c].astype(object)
+            df.loc[whole, c] = num[whole].astype(np.int64).to_numpy(dtype=object)
+    return df
+
+
+def upsert_matches(raw, updates):
+    """`raw` (the CSV as read) with `updates` applied, plus what changed.
+
+    Each row of `updates` is matched on its 'Match Key' when it has one, else
+    on the key of its own date and opponent. Matched rows take every cell of
+    `updates` that is not NaN, with empty strings clearing the field.
+    Rows without a key that match nothing are appended; a given key that
+    matches nothing is an error, not an insert. Returns `(frame, counts)`
+    with counts {'updated': n, 'inserted': n}. Raises ValueError for unknown
+    columns or keys repeated in `updates`, and for unknown keys and problem
+    rows with their RowErrors (lines counted as in an uploaded CSV) as its
+    second argument.
+    """
+    updates = updates.drop(columns=[c for c in DERIVED_COLS if c in updates.columns]).reset_index(drop=True)
+    unknown = [c for c in updates.columns if c != KEY_COL and c not in raw.columns]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(map(str, unknown))}")
+    cols = [c for c in updates.columns if c != KEY_COL]
+    given = updates[KEY_COL].astype(object) if KEY_COL in updates.columns else pd.Series(None, index=updates.index, dtype=object)
+    given = given.where(given.notna() & (given.astype(str).str.strip() != ''))
+    keys = given.fillna(match_keys(updates[cols]) if {'Day', 'Month', 'Year', 'Opponent'} <= set(cols)
+                        else pd.Series(None, index=updates.index, dtype=object))
+    if keys.isna().any():
+        raise ValueError("Rows without a Match Key need Day, Month, Year and Opponent.")
+    repeated = keys[keys.duplicated()].unique()
+    if len(repeated):
+        raise ValueError(f"Match keys repeated in the batch: {', '.join(map(str, repeated))}")
+
+    cells = updates[cols].to_numpy(dtype=object, copy=True)
+    cleared = np.frompyfunc(lambda v: isinstance(v, str) and not v.strip(), 1, 1)(cells).astype(bool)
+    cells[cleared] = None
+    filled = pd.notna(cells) | cleared
+
+    existing = pd.Series(raw.index, index=match_keys(raw).to_numpy())
+    found = keys.isin(existing.index).to_numpy()
+    # A given key that is not in the file is a fixture edited since the batch was made, not a new one
+    stale = given.notna().to_numpy() & ~found
+    if stale.any():
+        errors = [RowError(int(pos) + 2, KEY_COL, f"no match with key '{given.iloc[pos]}'; it may have been edited since")
+                  for pos in np.flatnonzero(stale)]
+        raise ValueError(f"{len(errors)} rows have unknown match keys; nothing was saved.", errors)
+    merged = raw.copy()
+    if found.any():
+        target = existing[keys[found]].to_numpy()
+        for j, c in enumerate(cols):
+            sel = filled[found, j]
+            merged[c] = merged[c].astype(object)
+            merged.loc[target[sel], c] = cells[found, j][sel]
+    added = pd.DataFrame(cells[~found], columns=cols).reindex(columns=raw.columns)
+    merged = pd.concat([merged, added], ignore_index=True) if len(added) else merged
+    merged = _whole_date_parts(merged)
+
+    # Check the changed rows as they will be stored; line numbers follow `updates`
+    changed = np.concatenate([existing[keys[found]].to_numpy(), np.arange(len(raw), len(merged))])
+    order = np.concatenate([np.flatnonzero(found), np.flatnonzero(~found)])
+    check = clean_matches(merged.loc[changed].reset_index(drop=True).copy())
+    errors = [RowError(int(order[pos]) + 2, column, message) for pos, column, message in check_matches(check)]
+    if errors:
+        raise ValueError(f"{len(errors)} problems in the batch; nothing was saved.", sorted(errors))
+    return merged, {'updated': int(found.sum()), 'inserted': int((~found).sum())}
@@ -0,0 +1,176 @@
+"""Benchmark the stats hot paths on synthetic datasets scaled from rangers_data.csv.
+
+    python scripts/benchmark.py --scales 1 10 100 --out bench_report.json
+    python scripts/benchmark.py --scales 10 --baseline bench_report.json
+
+A scale-k dataset models k clubs playing the real fixture list: the date,
+season, competition, opponent and result columns are the real ones repeated k
+times, and each club gets its own pool of synthetic players with realistic
+squad turnover (22 lineup slots, sparse substitutes in early eras). 1000x is
+~8.2M rows and needs tens of GB of RAM.
+
+The report is JSON with one record per (scale, op). With --baseline, any op
+whose median is more than --tolerance slower than the baseline's, and slower
+by at least --floor-ms, fails the run; the floor keeps sub-millisecond ops
+from flapping on timer noise.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import rangers_stats as rs  # noqa: E402
+from rangers_stats import snapshot  # noqa: E402
+from rangers_stats.data import SLOT_COLS, read_matches  # noqa: E402
+from rangers_stats.dataset import Dataset  # noqa: E402
+from rangers_stats.importer import import_matches  # noqa: E402
+from rangers_stats.index import build_appearance_index  # noqa: E402
+
+SQUAD_SIZE = 30
+TURNOVER = 0.12  # new players per match, so a squad turns over in ~250 games
+
+
+def synthetic_matches(template, scale, seed=0):
+    """`scale` clubs' worth of matches shaped like `template` (the raw CSV frame)."""
+    rng = np.random.default_rng(seed)
+    n = len(template)
+    # Oldest first so squad turnover follows the calendar
+    base = template.iloc[::-1].reset_index(drop=True)
+    has_subs = base[SLOT_COLS[11:]].notna().to_numpy()
+    frames = []
+    for club in range(scale):
+        first = (np.arange(n) * TURNOVER).astype(np.int64)
+        picks = np.argsort(rng.random((n, SQUAD_SIZE)), axis=1)[:, :len(SLOT_COLS)] + first[:, None]
+        names = np.char.add(f"C{club} Player ", picks.astype(str)).astype(object)
+        names[:, 11:][~has_subs] = None
+        lineup = pd.DataFrame(names, columns=SLOT_COLS)
+        meta = base.drop(columns=SLOT_COLS).copy()
+        meta['Win/Lose/Draw'] = rng.permutation(meta['Win/Lose/Draw'].to_numpy())
+        frames.append(pd.concat([meta, lineup], axis=1)[template.columns])
+    return pd.concat(frames, ignore_index=True)
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def bench_scale(template, scale, repeat, workdir):
+    path = os.path.join(workdir, f"synthetic_x{scale}.csv")
+    synthetic_matches(template, scale).to_csv(path, index=False)
+
+    def cold_snapshot():
+        shutil.rmtree(snapshot.snapshot_dir(path), ignore_errors=True)
+        snapshot.load_or_build(path, lambda: import_matches(path)[0])
+
+    results = {}
+    results['load_csv'] = timed(lambda: read_matches(path), repeat)
+    results['import_chunked'] = timed(lambda: import_matches(path), repeat)
+    results['load_snapshot_cold'] = timed(cold_snapshot, repeat)
+    results['load_snapshot_warm'] = timed(lambda: snapshot.load_or_build(path, lambda: import_matches(path)[0]), repeat)
+
+    df = snapshot.load_or_build(path, lambda: import_matches(path)[0])
+    results['index_build'] = timed(lambda: build_appearance_index(df), repeat)
+    index = build_appearance_index(df)
+    results['player_list'] = timed(lambda: Dataset(df, index=index).players(), repeat)
+
+    # Busiest players are the worst case for per-player work
+    apps = np.diff(index['indptr'])
+    busiest = [index['players'][i] for i in np.argsort(apps)[::-1][:max(repeat, 2)]]
+    results['cube_build'] = timed(lambda: Dataset(df, index=index).cube(), repeat)
+    results['partnerships_build'] = timed(lambda: Dataset(df, index=index).partnerships(), repeat)
+    results['player_summary_cold'] = timed(lambda: rs.player_summary(Dataset(df, index=index), busiest[0]), repeat)
+
+    ds = Dataset(df, index=index)
+    for player in busiest:
+        rs.player_summary(ds, player)
+    players = iter(busiest * repeat)
+    results['player_summary_warm'] = timed(lambda: rs.player_summary(ds, next(players)), repeat)
+    players = iter(busiest * repeat)
+    results['partnership_ranking'] = timed(lambda: rs.partnership_table(ds, next(players)).sort_values(['WinRate', 'Apps']), repeat)
+    results['player_matches'] = timed(lambda: rs.player_matches(ds, busiest[0]), repeat)
+    results['head_to_head'] = timed(lambda: (rs.h2h_stats(ds, busiest[0]), rs.h2h_stats(ds, busiest[1]),
+                                             rs.partnership_chem(ds, busiest[0], busiest[1])), repeat)
+
+    shutil.rmtree(snapshot.snapshot_dir(path), ignore_errors=True)
+    os.remove(path)
+    return len(df), len(index['players']), results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--csv', default=os.path.join(ROOT, 'rangers_data.csv'))
+    ap.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--out', default='bench_report.json')
+    ap.add_argument('--baseline', help="earlier report to compare medians against")
+    ap.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    ap.add_argument('--floor-ms', type=float, default=1.0, help="slowdowns smaller than this never count")
+    args = ap.parse_args()
+
+    # Synthetic sub slots mix blanks and names across chunks; pandas warns about it on every read
+    warnings.simplefilter('ignore', pd.errors.DtypeWarning)
+    template = pd.read_csv(args.csv)
+    workdir = tempfile.mkdtemp(prefix='rangers-bench-')
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'results': [],
+    }
+    try:
+        for scale in args.scales:
+            rows, players, results = bench_scale(template, scale, args.repeat, workdir)
+            for op, times in results.items():
+                report['results'].append({
+                    'scale': scale, 'rows': rows, 'players': players, 'op': op,
+                    'min_s': min(times), 'median_s': statistics.median(times),
+                })
+                print(f"x{scale:<5} {rows:>9} rows {players:>8} players  {op:<22} {statistics.median(times) * 1000:>10.1f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"Report written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            before = {(r['scale'], r['op']): r['median_s'] for r in json.load(f)['results']}
+        slower = [
+            (r['scale'], r['op'], before[(r['scale'], r['op'])], r['median_s'])
+            for r in report['results']
+            if (r['scale'], r['op']) in before
+            and r['median_s'] > before[(r['scale'], r['op'])] * (1 + args.tolerance)
+            and r['median_s'] - before[(r['scale'], r['op'])] > args.floor_ms / 1000
+        ]
+        for scale, op, old, new in slower:
+            print(f"REGRESSION x{scale} {op}: {old * 1000:.1f} ms -> {new * 1000:.1f} ms")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
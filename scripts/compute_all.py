@@ -0,0 +1,40 @@
+"""Write the headline stats of every player to one table.
+
+    python scripts/compute_all.py --out player_stats.csv
+    python scripts/compute_all.py --season "1990 - 91" --competition League
+
+Runs in one process by default; with --workers N (0: one per CPU) players
+are sharded across N processes forked from this one after the match data is
+loaded and indexed. Columns: Player, Apps, Starts, Subs, W, D, L, Win Rate,
+Best Partner, Best Partner Games and Best Partner Win Rate.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from rangers_stats import ALL_COMPS, ALL_SEASONS  # noqa: E402
+from rangers_stats.batch import compute_all  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--csv', default=os.path.join(ROOT, 'rangers_data.csv'))
+    ap.add_argument('--out', default='player_stats.csv')
+    ap.add_argument('--workers', type=int, default=1)
+    ap.add_argument('--season', default=ALL_SEASONS)
+    ap.add_argument('--competition', default=ALL_COMPS)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    table = compute_all(args.csv, args.workers, args.season, args.competition)
+    table = table[table['Apps'] > 0]
+    table.to_csv(args.out, index=False)
+    print(f"{len(table):,} players written to {args.out} in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Export the dashboard stats as static files, and optionally serve them.
+
+    python scripts/export_stats.py --out stats_export
+    python scripts/export_stats.py --format parquet --full
+    python scripts/export_stats.py --serve --port 8765
+
+Writes one JSON file per player and per season, the headline tables as
+players.<fmt> / seasons.<fmt>, and manifest.json listing every file with its
+ETag. Re-running only rewrites players and seasons touched by matches changed
+since the last export (--full rewrites everything). With --serve, the export
+is then served over HTTP with ETag revalidation until interrupted; GET /
+returns the manifest.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from rangers_stats import MatchStore  # noqa: E402
+from rangers_stats.export import EXPORT_DIR, TABLE_FORMATS, export_stats, make_server  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--csv', default=os.path.join(ROOT, 'rangers_data.csv'))
+    ap.add_argument('--out', default=EXPORT_DIR)
+    ap.add_argument('--format', choices=TABLE_FORMATS, default='json')
+    ap.add_argument('--full', action='store_true', help="rewrite every file, not just the touched ones")
+    ap.add_argument('--serve', action='store_true')
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8765)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    try:
+        manifest = export_stats(MatchStore(args.csv).current(), args.out, args.format, args.full)
+    except ValueError as e:
+        sys.exit(str(e))
+    updated = manifest['updated']
+    print(f"{updated['players']:,} of {len(manifest['players']):,} players and {updated['seasons']} of "
+          f"{len(manifest['seasons'])} seasons written to {args.out} in {time.perf_counter() - t0:.2f}s")
+
+    if args.serve:
+        server = make_server(args.out, args.host, args.port)
+        print(f"Serving {args.out} on http://{args.host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
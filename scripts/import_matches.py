@@ -0,0 +1,56 @@
+"""Check and pre-load a match CSV before the dashboard serves it.
+
+    python scripts/import_matches.py other_club.csv --chunksize 50000
+
+Parses the file in chunks with progress on stderr, prints every problem row
+with its CSV line number, and writes the columnar snapshot the app loads from
+(unless --no-snapshot). Exits non-zero if any row had a problem.
+"""
+import argparse
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rangers_stats import snapshot  # noqa: E402
+from rangers_stats.importer import CHUNK_ROWS, import_matches  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('csv')
+    ap.add_argument('--chunksize', type=int, default=CHUNK_ROWS)
+    ap.add_argument('--no-snapshot', action='store_true')
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+
+    def progress(done, total, rows):
+        pct = done / total * 100 if total else 100
+        print(f"\r{pct:5.1f}%  {rows:,} rows  {time.perf_counter() - t0:.1f}s", end='', file=sys.stderr)
+
+    found = []
+
+    def build():
+        df, errors = import_matches(args.csv, args.chunksize, progress)
+        found.extend(errors)
+        return df
+
+    if args.no_snapshot:
+        df = build()
+    else:
+        # Force a rebuild so the errors are re-checked against the file as it is now
+        shutil.rmtree(snapshot.snapshot_dir(args.csv), ignore_errors=True)
+        df = snapshot.load_or_build(args.csv, build)
+    print(file=sys.stderr)
+
+    for e in found:
+        print(f"line {e.line}: {e.column or 'row'}: {e.message}")
+    print(f"{len(df):,} matches, {len(found)} problem rows, {time.perf_counter() - t0:.1f}s")
+    sys.exit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
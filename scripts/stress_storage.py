@@ -0,0 +1,121 @@
+"""Stress the storage layer with parallel writers and readers.
+
+Runs against a temporary copy of the CSV, never the real file:
+
+    python scripts/stress_storage.py --writers 4 --readers 4 --ops 10
+
+Writers mix single-row appends with full read-modify-write rewrites; readers
+parse the file continuously. At the end every appended row must be present
+exactly once, every read must have parsed cleanly with a non-decreasing row
+count, and the data version must equal the number of writes.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rangers_stats import storage  # noqa: E402
+
+
+def writer(path, wid, ops, rewrite_every):
+    for k in range(ops):
+        if rewrite_every and k % rewrite_every == rewrite_every - 1:
+            def touch(raw):
+                raw.at[0, 'Title'] = f"stress rewrite {wid}-{k}"
+                return raw
+            storage.update_csv(path, touch)
+        else:
+            storage.append_row(path, {
+                'Title': f"stress {wid}-{k}", 'Opponent': f"Stress W{wid}-{k}", 'Competition': 'Stress',
+                'Day': 1, 'Month': 'January', 'Year': 2100, 'Tag Season': '2099 - 00',
+                'Score (Rangers First)': '1-0', 'Win/Lose/Draw': 'Win', 'R1': f"Stress Player {wid}",
+            })
+
+
+def reader(path, header, stop, results):
+    last_rows, last_version, n = 0, 0, 0
+    while not stop.is_set():
+        try:
+            version = storage.read_version(path)
+            df = storage.read_csv(path)
+            n += 1
+            if list(df.columns) != header:
+                results.put(('error', f"columns changed: {list(df.columns)[:3]}..."))
+            if len(df) < last_rows:
+                results.put(('error', f"row count went back from {last_rows} to {len(df)}"))
+            if version < last_version:
+                results.put(('error', f"version went back from {last_version} to {version}"))
+            if df['Opponent'].isna().any():
+                results.put(('error', "row with no opponent (torn write)"))
+            last_rows, last_version = len(df), version
+        except Exception as e:
+            results.put(('error', f"read failed: {e!r}"))
+    results.put(('reads', n))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--csv', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'rangers_data.csv'))
+    ap.add_argument('--writers', type=int, default=4)
+    ap.add_argument('--readers', type=int, default=4)
+    ap.add_argument('--ops', type=int, default=10, help="writes per writer")
+    ap.add_argument('--rewrite-every', type=int, default=5, help="every Nth write is a full rewrite (0 = appends only)")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='stress-storage-')
+    path = os.path.join(tmp, 'matches.csv')
+    shutil.copy(args.csv, path)
+    base = storage.read_csv(path)
+    header = list(base.columns)
+
+    ctx = mp.get_context('spawn')
+    stop, results = ctx.Event(), ctx.Queue()
+    rs = [ctx.Process(target=reader, args=(path, header, stop, results)) for _ in range(args.readers)]
+    ws = [ctx.Process(target=writer, args=(path, w, args.ops, args.rewrite_every)) for w in range(args.writers)]
+    t0 = time.perf_counter()
+    for p in rs + ws:
+        p.start()
+    for p in ws:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+
+    # Drain before joining: a reader can't exit until its queued messages are consumed
+    problems, n_reads, done = [], 0, 0
+    while done < len(rs):
+        kind, value = results.get()
+        if kind == 'reads':
+            n_reads, done = n_reads + value, done + 1
+        else:
+            problems.append(value)
+    for p in rs:
+        p.join()
+    problems += [f"writer exited with {p.exitcode}" for p in ws if p.exitcode]
+
+    final = storage.read_csv(path)
+    rewrites = args.ops // args.rewrite_every if args.rewrite_every else 0
+    appends = args.writers * (args.ops - rewrites)
+    stress = final['Opponent'][final['Opponent'].str.startswith('Stress W', na=False)]
+    if len(final) != len(base) + appends:
+        problems.append(f"expected {len(base) + appends} rows, found {len(final)}")
+    if stress.duplicated().any() or len(stress) != appends:
+        problems.append(f"expected {appends} distinct appended rows, found {stress.nunique()}")
+    if storage.read_version(path) != args.writers * args.ops:
+        problems.append(f"expected version {args.writers * args.ops}, found {storage.read_version(path)}")
+
+    print(f"{args.writers * args.ops} writes, {n_reads} reads in {elapsed:.2f}s")
+    shutil.rmtree(tmp, ignore_errors=True)
+    if problems:
+        for p in problems[:20]:
+            print("FAIL:", p)
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+
+import rangers_stats as rs
+from rangers_stats.data import read_matches
+from rangers_stats.form import longest_runs, rolling_win_rate
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def test_longest_runs():
+    owner = np.array([0, 0, 0, 0, 0, 0, 1, 1, 2])
+    flag = np.array([1, 1, 0, 1, 1, 1, 1, 0, 0], dtype=bool)
+    longest, first, last, current = longest_runs(owner, flag, 4)
+    assert longest.tolist() == [3, 1, 0, 0]
+    assert first.tolist() == [3, 6, -1, -1]
+    assert last.tolist() == [5, 6, -1, -1]
+    assert current.tolist() == [3, 0, 0, 0]
+
+
+def test_longest_runs_ties_go_to_the_earliest():
+    longest, first, last, current = longest_runs(np.zeros(5, dtype=np.int64), np.array([1, 1, 0, 1, 1], dtype=bool), 1)
+    assert (longest[0], first[0], last[0], current[0]) == (2, 0, 1, 2)
+
+
+def test_rolling_win_rate():
+    # W, L, W, W, D for owner 0 then L, W for owner 1; codes index RESULT_CODES (W, D, L)
+    codes = np.array([0, 2, 0, 0, 1, 2, 0])
+    owner = np.array([0, 0, 0, 0, 0, 1, 1])
+    rate = rolling_win_rate(owner, np.arange(7), codes, window=3)
+    assert rate == pytest.approx([100, 50, 200 / 3, 200 / 3, 200 / 3, 0, 50])
+
+
+@pytest.fixture(scope='module')
+def ds():
+    return rs.Dataset(read_matches(os.path.join(ROOT, 'rangers_data.csv')))
+
+
+def test_streaks_under_a_filter_without_matches(ds):
+    empty = dict(s_sea='1873-74', s_comp='Anglo-Scottish Cup')
+    assert not ds.mask(**empty).any()
+    table = rs.streaks(ds, **empty)
+    assert len(table) == len(ds.index['players'])
+    assert (table['Longest Unbeaten'] == 0).all() and table['Unbeaten From'].isna().all()
+    assert rs.streaks(ds, team=True, **empty)['Longest Winning'].tolist() == [0]
+    assert rs.player_streaks(ds, 'John Greig', **empty)['Current Unbeaten'] == 0
+    assert rs.rolling_form(ds, 'John Greig', **empty).empty
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from rangers_stats.importer import import_matches
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+@pytest.fixture
+def csv_with_bad_row(tmp_path):
+    with open(os.path.join(ROOT, 'rangers_data.csv'), encoding='utf-8') as f:
+        lines = [next(f) for _ in range(11)]
+    # A short line: blank Day, nothing after Month
+    lines.insert(5, "Rangers v Clyde,Clyde,Challenge Match,Home,,July\n")
+    path = tmp_path / 'matches.csv'
+    path.write_text(''.join(lines), encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('chunksize', [50_000, 3])
+def test_bad_row_does_not_spoil_its_chunk(csv_with_bad_row, chunksize):
+    df, errors = import_matches(csv_with_bad_row, chunksize=chunksize)
+    assert len(df) == 11
+    assert {e.line for e in errors} == {6}
+    assert df['Date'].isna().sum() == 1
+    assert not df['DateStr'].str.contains(r'\.0', na=False).any()
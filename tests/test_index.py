@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import rangers_stats as rs
+from rangers_stats import storage
+from rangers_stats.data import SLOT_COLS, clean_matches, compact_matches
+from rangers_stats.index import build_appearance_index
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+@pytest.fixture(scope='module')
+def raw():
+    return storage.read_csv(os.path.join(ROOT, 'rangers_data.csv'))
+
+
+def dataset(raw):
+    return rs.Dataset(compact_matches(clean_matches(raw.copy())).sort_values('Date', ascending=False))
+
+
+def appearances(df, index):
+    """{player: sorted (match, starter) pairs}, with matches named by their frame label."""
+    labels = df.index.to_numpy()
+    return {
+        p: sorted(zip(labels[index['rows'][index['indptr'][i]:index['indptr'][i + 1]]].tolist(),
+                      index['starter'][index['indptr'][i]:index['indptr'][i + 1]].tolist()))
+        for i, p in enumerate(index['players'])
+    }
+
+
+@pytest.mark.parametrize('where', ['newest', 'middle', 'oldest'])
+def test_with_match_matches_a_rebuilt_dataset(raw, where):
+    order = raw.index[np.argsort(pd.to_datetime(rs.match_keys(raw).str[:10]).to_numpy(), kind='stable')]
+    i = {'newest': order[-1], 'middle': order[len(order) // 2], 'oldest': order[0]}[where]
+    new = clean_matches(raw.loc[[i]].copy())
+    new.loc[i, 'R2'] = 'Brand New Player'
+    full_raw = raw.copy()
+    full_raw.loc[i, 'R2'] = 'Brand New Player'
+
+    patched = dataset(raw.drop(index=i)).with_match(new, 1)
+    full = dataset(full_raw)
+
+    # The patched index is exactly the index of its own frame
+    assert appearances(patched.df, patched.index) == appearances(patched.df, build_appearance_index(patched.df))
+    assert len(patched.df) == len(full.df)
+    assert patched.df['Date'].is_monotonic_decreasing
+
+    lineup = [p for p in new[SLOT_COLS].iloc[0] if pd.notna(p)]
+    for player in lineup:
+        got, want = rs.player_summary(patched, player), rs.player_summary(full, player)
+        assert {k: v for k, v in got.items() if k != 'Best Partner'} == {k: v for k, v in want.items() if k != 'Best Partner'}
+    pd.testing.assert_frame_equal(rs.partnership_table(patched, lineup[0]), rs.partnership_table(full, lineup[0]))
@@ -0,0 +1,39 @@
+import os
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rangers_stats.data import STARTER_COLS, read_matches
+from rangers_stats.lineups import frequent_combinations
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+@pytest.fixture(scope='module')
+def matches():
+    df = read_matches(os.path.join(ROOT, 'rangers_data.csv'))
+    mask = np.zeros(len(df), dtype=bool)
+    mask[:400] = True  # The newest 400 matches keep the brute force quick
+    return df, mask, (df['ResultCode'] == 'W').to_numpy()
+
+
+def brute_force(df, mask, won, size, min_games):
+    games, wins = Counter(), Counter()
+    for lineup, w in zip(df[STARTER_COLS].to_numpy(dtype=object)[mask], won[mask]):
+        names = sorted({p for p in lineup if pd.notna(p)})
+        for combo in combinations(names, size):
+            games[combo] += 1
+            wins[combo] += int(w)
+    return {", ".join(c): (n, wins[c]) for c, n in games.items() if n >= min_games}
+
+
+@pytest.mark.parametrize('size, min_games', [(2, 5), (3, 5), (4, 5), (5, 5), (11, 1)])
+def test_frequent_combinations_match_brute_force(matches, size, min_games):
+    df, mask, won = matches
+    table = frequent_combinations(df, mask, won, size, min_games)
+    got = {p: (g, w) for p, g, w in zip(table['Players'], table['Games'], table['Wins'])}
+    assert got == brute_force(df, mask, won, size, min_games)
+    assert len(got)
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from rangers_stats import KEY_COL, RowError, match_keys, storage, upsert_matches
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+@pytest.fixture(scope='module')
+def raw():
+    return storage.read_csv(os.path.join(ROOT, 'rangers_data.csv'))
+
+
+def test_stale_key_is_rejected_not_inserted(raw):
+    keys = match_keys(raw)
+    i = keys.index[keys == '1987-05-07 Celtic'][0]
+    # The grid row as exported before the fixture's date was corrected
+    old_row = raw.loc[[i]].assign(**{KEY_COL: keys[i]})
+
+    edited, counts = upsert_matches(raw, old_row[[KEY_COL]].assign(Day=2))
+    assert counts == {'updated': 1, 'inserted': 0}
+    assert '1987-05-02 Celtic' in set(match_keys(edited))
+
+    with pytest.raises(ValueError) as e:
+        upsert_matches(edited, old_row)
+    assert e.value.args[1] == [RowError(2, KEY_COL, "no match with key '1987-05-07 Celtic'; it may have been edited since")]
+
+
+def test_rows_without_a_key_are_inserted(raw):
+    row = raw.iloc[[0]].assign(Year=2031)
+    merged, counts = upsert_matches(raw, row)
+    assert counts == {'updated': 0, 'inserted': 1}
+    assert len(merged) == len(raw) + 1